@@ -0,0 +1,111 @@
+"""Agrégations partagées par les onglets du dashboard"""
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from profiling import profiled
+
+# Métriques proposées dans les blocs « Évolution temporelle »
+TIME_SERIES_METRICS = {
+    'Vues': 'vues',
+    'Likes': 'likes',
+    'Commentaires': 'commentaires',
+    'Partages': 'partages',
+    'Enregistrements': 'enregistrements'
+}
+
+# Dimensions du cube journalier : la date et toutes les colonnes filtrables
+ROLLUP_DIMENSIONS = ['date', 'type', 'contenu', 'periode', 'collab', 'heure_bin', 'hashtags']
+
+
+def period_key(dates, resolution):
+    """Période de chaque date : le jour, le lundi de la semaine ou le mois ("AAAA-MM")"""
+    if resolution == 'Jour':
+        return dates
+    elif resolution == 'Semaine':
+        return dates - pd.to_timedelta(dates.dt.dayofweek, unit='D')
+    else:  # Mois
+        return dates.dt.to_period('M').astype(str)
+
+
+@profiled('cube journalier')
+def build_rollup(df, metric_cols):
+    """Cube journalier : somme et effectif (valeurs non manquantes) de chaque métrique
+
+    Une ligne par combinaison observée des dimensions, triée par date (NaT en fin)
+    comme le frame des posts, pour être indexée par un FilterIndex. Les sommes
+    sont élargies (Int64, float64) pour pouvoir être ré-agrégées sans débordement.
+    """
+    dims = [col for col in ROLLUP_DIMENSIONS if col in df.columns]
+    grouped = df.groupby(dims, observed=True, dropna=False, sort=False)[metric_cols]
+
+    sums = grouped.sum()
+    sums = sums.astype({col: 'float64' if pd.api.types.is_float_dtype(dtype) else 'Int64'
+                        for col, dtype in sums.dtypes.items()})
+    counts = grouped.count().astype('int64')
+
+    cube = pd.concat([sums.add_prefix('sum_'), counts.add_prefix('count_'),
+                      grouped.size().rename('posts')], axis=1).reset_index()
+    return cube.sort_values('date', kind='stable', na_position='last').reset_index(drop=True)
+
+
+def append_rollup(cube, new_rows, metric_cols):
+    """Ajouter des posts au cube : leurs agrégats sont sommés aux cellules existantes"""
+    added = build_rollup(new_rows, metric_cols)
+    dims = [col for col in ROLLUP_DIMENSIONS if col in cube.columns]
+
+    # Catégories réunies (et triées, comme au chargement) avant la concaténation
+    for col in dims:
+        if isinstance(cube[col].dtype, pd.CategoricalDtype) and cube[col].dtype != added[col].dtype:
+            categories = union_categoricals([cube[col], added[col]], sort_categories=True).categories
+            cube = cube.assign(**{col: cube[col].cat.set_categories(categories)})
+            added = added.assign(**{col: added[col].cat.set_categories(categories)})
+
+    merged = pd.concat([cube, added], ignore_index=True)
+    merged = merged.groupby(dims, observed=True, dropna=False, sort=False).sum().reset_index()
+    return merged.sort_values('date', kind='stable', na_position='last').reset_index(drop=True)
+
+
+def rollup_time_series(cube, metric_cols, resolution, aggregation):
+    """Séries temporelles des métriques, ré-agrégées à partir d'une tranche du cube
+
+    Retourne un DataFrame indexé par période, une colonne par métrique ; la
+    moyenne est la somme divisée par l'effectif, comme une moyenne sur les posts.
+    """
+    grouped = cube.groupby(period_key(cube['date'], resolution).rename('period'))
+    sums = grouped[[f'sum_{col}' for col in metric_cols]].sum()
+    sums.columns = metric_cols
+    if aggregation == 'Somme':
+        return sums
+    counts = grouped[[f'count_{col}' for col in metric_cols]].sum()
+    counts.columns = metric_cols
+    return sums / counts.where(counts > 0)
+
+
+# Statistiques calculées pour chaque métrique de chaque segment
+SEGMENT_STATS = ['mean', 'sum', 'median', 'count']
+
+
+def segment_stats(df, segments, metric_cols):
+    """Statistiques (SEGMENT_STATS) de toutes les métriques pour chaque segment
+
+    Un segment est une colonne, ou un tuple de colonnes pour un segment croisé.
+    Un seul groupby multi-agrégations par segment ; retourne {segment: DataFrame}
+    dont les colonnes sont des couples (métrique, statistique).
+    """
+    return {segment: _segment_stats(df, segment, metric_cols) for segment in segments}
+
+
+def _segment_stats(df, segment, metric_cols):
+    if isinstance(segment, str):
+        return df.groupby(segment, observed=True)[metric_cols].agg(SEGMENT_STATS)
+    # Segment croisé : groupby sur plusieurs colonnes (codes des catégories), les
+    # valeurs manquantes formant leur propre groupe ; seuls les groupes obtenus
+    # reçoivent un libellé « valeur × valeur »
+    stats = df.groupby(list(segment), observed=True, dropna=False)[metric_cols].agg(SEGMENT_STATS)
+    stats.index = pd.Index([' × '.join(map(str, key)) for key in stats.index], name='segment')
+    return stats
+
+
+def segment_series(stats, metric_col, stat):
+    """Une statistique d'une métrique par segment, nommée comme la métrique"""
+    return stats[(metric_col, stat)].rename(metric_col)
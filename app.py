@@ -1,11 +1,19 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
-from pathlib import Path
 import locale
 from datetime import datetime
 import pytz
+import uuid
+from functools import partial
+
+from aggregations import TIME_SERIES_METRICS, rollup_time_series, segment_series, segment_stats
+from data_loader import COLUMN_MAPPING, HEURE_BIN_LABELS, NUMERIC_COLUMNS
+from datasets import DatasetRegistry, discover_sources
+from exports import EXCEL_MAX_ROWS, EXPORT_FORMATS, export_labels, write_export
+from filters import Selection, TypeViews, date_bounds
+from profiling import PROFILE_LOG_PATH, append_log, stage, start_profiling, stop_profiling
+from sql_backend import SQL_ENGINE, SqlBackend, SqlSelection
 
 # Configuration locale FR
 try:
@@ -28,6 +36,9 @@ st.set_page_config(
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
 
+# Identifiants ayant accès au panneau de profilage
+ADMIN_USERS = {"admin"}
+
 # Fonction d'authentification
 def authenticate_user(username, password):
     """Vérifier les identifiants utilisateur"""
@@ -158,6 +169,7 @@ def show_login_screen():
             if st.button("Se connecter", key="login_button", use_container_width=True):
                 if authenticate_user(username, password):
                     st.session_state.authenticated = True
+                    st.session_state.username = username
                     st.rerun()
                 else:
                     st.error("❌ Identifiant ou mot de passe incorrect")
@@ -182,6 +194,13 @@ if not st.session_state.authenticated:
 
 # ======================== FIN SYSTÈME D'AUTHENTIFICATION ========================
 
+# Profilage de l'exécution : administrateurs ayant coché « Profiler les exécutions »
+is_admin = st.session_state.get('username') in ADMIN_USERS
+if is_admin and st.session_state.get('profiling', False):
+    start_profiling()
+else:
+    stop_profiling()
+
 # Configuration CSS complète pour thème sombre cohérent
 st.markdown("""
 <style>
@@ -871,43 +890,10 @@ with col_logout:
 # Chemin du fichier de données
 DATA_PATH = "./insta_data.csv"
 
-# Mapping des colonnes FR vers snake_case
-COLUMN_MAPPING = {
-    'Date': 'date',
-    'Heure': 'heure',
-    'Periode': 'periode',
-    'Lien': 'lien',
-    'Titre': 'titre',
-    'Type': 'type',
-    'Durée (Reels)': 'duree_reels',
-    'Nb Image (Carrousel)': 'nb_images_carousel',
-    'Contenue': 'contenu',
-    'Collaboration': 'collab',
-    'Vues': 'vues',
-    'Vues Followers': 'vues_followers',
-    'Vues Non Followers': 'vues_non_followers',
-    'Nb Interaction': 'nb_interactions',
-    'Likes': 'likes',
-    'Commentaires': 'commentaires',
-    'Partage': 'partages',
-    'Enregistrement': 'enregistrements',
-    'Activté du Profil': 'activite_profil',
-    'Visites du profil': 'visites_profil',
-    'Followers en plus': 'followers_plus',
-    'Appuis sur des liens externes': 'clics_externes',
-    'Hashtags': 'hashtags'
-}
-
-# Mapping des jours de la semaine en français
-JOURS_SEMAINE = {
-    0: 'Lun',
-    1: 'Mar',
-    2: 'Mer',
-    3: 'Jeu',
-    4: 'Ven',
-    5: 'Sam',
-    6: 'Dim'
-}
+# Autres comptes : un CSV par compte dans DATA_DIR (nom du compte = nom du fichier)
+# et/ou des entrées {"Nom du compte": "chemin/vers/export.csv"} dans DATASETS
+DATA_DIR = "./data"
+DATASETS = {}
 
 # Fonction pour formater les grands nombres
 def format_number(x):
@@ -959,124 +945,233 @@ def configure_plotly_theme(fig, title=None):
         fig.update_layout(title=title)
     return fig
 
-# Fonction pour déterminer la période de la journée
-def get_heure_bin(heure):
-    if pd.isna(heure):
-        return None
-    try:
-        if ':' in str(heure):
-            h = int(str(heure).split(':')[0])
-        else:
-            h = int(float(str(heure)))
-        
-        if 0 <= h <= 5:
-            return 'Nuit'
-        elif 6 <= h <= 9:
-            return 'Matin'
-        elif 10 <= h <= 13:
-            return 'Midi'
-        elif 14 <= h <= 17:
-            return 'Après-midi'
-        elif 18 <= h <= 21:
-            return 'Soir'
-        else:
-            return 'Tard'
-    except:
-        return None
+# Séries temporelles de toutes les métriques, calculées une fois par combinaison
+# (sélection, type, résolution, agrégation) : changer de métriques ne recalcule rien.
+# Elles sont ré-agrégées depuis la tranche du cube journalier (ou par le moteur SQL),
+# extraite seulement en cas d'absence du cache.
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_time_series(selection, post_type, resolution, aggregation, _source, _bits=None):
+    """Agréger les métriques temporelles des lignes _bits du cube journalier (_source)"""
+    metric_cols = list(TIME_SERIES_METRICS.values())
+    if isinstance(_source, SqlSelection):
+        return _source.time_series(post_type, metric_cols, resolution, aggregation)
+    if post_type is not None:
+        _bits = _bits & _source.mask('type', [post_type])
+    return rollup_time_series(_source.select(_bits), metric_cols, resolution, aggregation)
+
+# Statistiques par segment de toutes les métriques, recalculées en un passage quand
+# les filtres changent : changer de segment ou de métrique est une simple lecture
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_segment_stats(selection, post_type, segments, metric_cols, _source):
+    """Statistiques par segment des posts retenus par la sélection"""
+    if isinstance(_source, SqlSelection):
+        return _source.segment_stats(post_type, list(segments), list(metric_cols))
+    return segment_stats(_source, list(segments), list(metric_cols))
+
+# Graphique Plotly, mesuré comme une étape du profilage (nommée d'après son titre)
+def render_chart(fig, **kwargs):
+    """Afficher un graphique Plotly"""
+    with stage(f"graphique : {fig.layout.title.text or 'sans titre'}"):
+        st.plotly_chart(fig, **kwargs)
+
+# Bloc « Évolution temporelle » commun à la vue d'ensemble et aux onglets par type
+# (fragment : ses propres contrôles ne réexécutent que ce bloc)
+@st.fragment
+def render_time_series(post_type, key_prefix, title, height):
+    """Afficher les métriques choisies dans le temps (post_type None : tous les posts)"""
+    def widget_key(name):
+        return f"{key_prefix}_{name}" if key_prefix else None
 
-# Vérification de l'existence du fichier
-if not Path(DATA_PATH).exists():
-    st.error(
-        "⚠️ Le fichier de données est introuvable.\n\n"
-        "Pour utiliser cette application :\n"
-        "1. Placez le fichier 'insta_data.csv' à la racine du projet\n"
-        "2. Vérifiez que le fichier est au format CSV avec séparateur ';'\n"
-        "3. Assurez-vous que le fichier contient les colonnes requises\n\n"
-        "Aucun widget d'upload n'est disponible pour des raisons de sécurité."
-    )
-    st.stop()
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        selected_metrics = st.multiselect(
+            "Métriques à afficher",
+            options=list(TIME_SERIES_METRICS.keys()),
+            default=['Vues', 'Likes'],
+            key=widget_key("metrics")
+        )
 
-# Chargement des données
-df = pd.read_csv(DATA_PATH, sep=';')
+    with col2:
+        # Sélection de la résolution temporelle
+        resolution = st.selectbox(
+            "Résolution",
+            options=['Jour', 'Semaine', 'Mois'],
+            index=0,
+            key=widget_key("resolution")
+        )
 
-# Suppression de la ligne d'en-tête si elle apparaît dans les données
-df = df[~df['Date'].astype(str).str.contains('Date', na=False)]
+        # Sélection de l'agrégation
+        aggregation = st.selectbox(
+            "Agrégation",
+            options=['Somme', 'Moyenne'],
+            index=0,
+            key=widget_key("aggregation")
+        )
 
-# Renommage des colonnes
-df = df.rename(columns=COLUMN_MAPPING)
+    if selected_metrics:
+        # selection_key, rollup_mask et sql décrivent les filtres actifs (définis dans la sidebar)
+        series = cached_time_series(selection_key, post_type, resolution, aggregation,
+                                    _source=sql or rollup_index, _bits=rollup_mask)
 
-# Conversion des colonnes numériques
-numeric_columns = ['vues', 'vues_followers', 'vues_non_followers', 'nb_interactions',
-                   'likes', 'commentaires', 'partages', 'enregistrements',
-                   'activite_profil', 'visites_profil', 'followers_plus',
-                   'clics_externes']  # Retrait de 'hashtags' des colonnes numériques
+        fig = px.line(template="plotly_dark")
+        fig = configure_plotly_theme(fig, title)
 
-for col in numeric_columns:
-    if col in df.columns:
-        df[col] = df[col].astype(str).str.replace(',', '.').replace('', np.nan)
-        df[col] = pd.to_numeric(df[col], errors='coerce')
+        for metric_name in selected_metrics:
+            grouped_data = series[TIME_SERIES_METRICS[metric_name]]
+            fig.add_scatter(
+                x=grouped_data.index,
+                y=grouped_data.values,
+                name=metric_name,
+                hovertemplate="%{y:,.0f}"
+            )
 
-# Traitement spécial pour les hashtags (remplacement des valeurs manquantes par 0)
-df['hashtags'] = df['hashtags'].fillna(0)
-df['hashtags'] = pd.to_numeric(df['hashtags'], errors='coerce')
+        fig.update_layout(
+            xaxis_title="Date",
+            yaxis_title="Valeur",
+            hovermode='x unified',
+            showlegend=True,
+            height=height
+        )
 
-# Traitement des dates et heures
-df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d', errors='coerce')
+        render_chart(fig, use_container_width=True)
+
+# Nuage de points d'un KPI en fonction d'une caractéristique des posts (fragment :
+# changer de KPI ne réexécute que ce bloc)
+@st.fragment
+def render_kpi_scatter(frame, x_col, x_label, kpi_options, key, title):
+    """Afficher le KPI choisi en fonction de x_col (title : libellé suivi du KPI)"""
+    selected_kpi = st.selectbox(
+        "KPI à analyser",
+        options=list(kpi_options.keys()),
+        key=key
+    )
+    
+    # Modification des scatter plots pour retirer LOWESS
+    fig_scatter = px.scatter(
+        frame,
+        x=x_col,
+        y=kpi_options[selected_kpi],
+        labels={
+            x_col: x_label,
+            kpi_options[selected_kpi]: selected_kpi
+        },
+        template="plotly_dark"
+    )
+    
+    # Configuration du thème sombre
+    fig_scatter = configure_plotly_theme(fig_scatter, f"{title} {selected_kpi}")
+    fig_scatter.update_layout(height=400)
+    
+    render_chart(fig_scatter, use_container_width=True)
 
-# Création du timestamp
-df['timestamp'] = df['date'].copy()
-mask_heure = df['heure'].notna()
+# Moyenne d'une métrique par segment pour un type de post (fragment : changer de
+# segment ou de métrique ne réexécute que ce bloc, les statistiques sont en cache)
+@st.fragment
+def render_segment_bars(post_type, frame, segment_options, kpi_options, key_prefix, value_format):
+    """Afficher la moyenne de la métrique choisie par segment"""
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        selected_segment = st.selectbox(
+            "Segment à analyser",
+            options=list(segment_options.keys()),
+            key=f"{key_prefix}_segment"
+        )
+    
+    with col2:
+        selected_metric = st.selectbox(
+            "Métrique à analyser",
+            options=list(kpi_options.keys()),
+            key=f"{key_prefix}_segment_metric"
+        )
+    
+    # Calcul des moyennes par segment
+    segment_col = segment_options[selected_segment]
+    metric_col = kpi_options[selected_metric]
+    
+    stats = cached_segment_stats(selection_key, post_type, tuple(segment_options.values()),
+                                 tuple(kpi_options.values()), _source=sql or frame)
+    segment_means = segment_series(stats[segment_col], metric_col, 'mean').sort_values(ascending=False)
+    
+    # Création du graphique en barres
+    fig_bars = px.bar(
+        segment_means,
+        template="plotly_dark"
+    )
+    
+    # Configuration du thème sombre
+    fig_bars = configure_plotly_theme(fig_bars, f"Moyenne de {selected_metric} par {selected_segment}")
+    fig_bars.update_layout(
+        xaxis_title=selected_segment,
+        yaxis_title=f"Moyenne de {selected_metric}",
+        height=400,
+        showlegend=False
+    )
+    
+    # Formatage des valeurs selon le type de métrique
+    if "taux" in metric_col.lower() or "pct" in metric_col.lower():
+        fig_bars.update_traces(
+            hovertemplate="%{y:.1%}"
+        )
+        fig_bars.update_layout(
+            yaxis_tickformat=".1%"
+        )
+    else:
+        fig_bars.update_traces(
+            hovertemplate=f"%{{y:{value_format}}}"
+        )
+    
+    render_chart(fig_bars, use_container_width=True)
 
-for idx in df[mask_heure].index:
-    try:
-        heure = str(df.loc[idx, 'heure'])
-        if ':' in heure:
-            h, m = map(int, heure.split(':'))
-        else:
-            h = int(float(heure))
-            m = 0
-        if pd.notna(df.loc[idx, 'date']):
-            df.loc[idx, 'timestamp'] = df.loc[idx, 'date'].replace(hour=h, minute=m)
-    except:
-        continue
-
-# Colonnes temporelles dérivées
-df['jour_semaine'] = df['date'].dt.dayofweek.map(JOURS_SEMAINE)
-df['semaine'] = df['date'].dt.isocalendar().week
-df['mois'] = df['date'].dt.month
-df['heure_bin'] = df['heure'].apply(get_heure_bin)
-
-# Création des colonnes type spécifiques
-df['is_reels'] = df['type'].fillna('').str.strip() == 'Reels'
-df['is_photo'] = df['type'].fillna('').str.strip() == 'Photo'
-df['is_carousel'] = df['type'].fillna('').str.strip() == 'Carrousel'
-
-# Conversion de la colonne collaboration en booléen
-df['collab'] = df['collab'].fillna('Non').str.strip() == 'Oui'
-
-# Recalcul des KPIs manquants
-# nb_interactions = likes + commentaires + enregistrements + partages
-df['nb_interactions_calc'] = df['likes'].fillna(0) + df['commentaires'].fillna(0) + \
-                               df['enregistrements'].fillna(0) + df['partages'].fillna(0)
-
-# taux_engagement = nb_interactions / vues
-df['taux_engagement'] = (df['nb_interactions'] / df['vues']).fillna(
-    df['nb_interactions_calc'] / df['vues'])
-
-# activite_profil = visites_profil + followers_plus + clics_externes
-df['activite_profil_calc'] = df['visites_profil'].fillna(0) + \
-                              df['followers_plus'].fillna(0) + \
-                              df['clics_externes'].fillna(0)
-
-# taux_attraction = activite_profil / vues
-df['taux_attraction'] = (df['activite_profil'] / df['vues']).fillna(
-    df['activite_profil_calc'] / df['vues'])
-
-# Autres taux
-df['profile_visit_rate'] = df['visites_profil'] / df['vues']
-df['follow_rate'] = df['followers_plus'] / df['vues']
-df['external_ctr'] = df['clics_externes'] / df['vues']
-df['pct_non_followers'] = df['vues_non_followers'] / (df['vues_followers'] + df['vues_non_followers'])
+# Jeux de données disponibles (vérification de l'existence des fichiers)
+data_sources = discover_sources(DATA_DIR, DATA_PATH, DATASETS)
+if not data_sources:
+    st.error(
+        "⚠️ Le fichier de données est introuvable.\n\n"
+        "Pour utiliser cette application :\n"
+        "1. Placez le fichier 'insta_data.csv' à la racine du projet (ou un CSV par compte dans le dossier 'data')\n"
+        "2. Vérifiez que le fichier est au format CSV avec séparateur ';'\n"
+        "3. Assurez-vous que le fichier contient les colonnes requises\n\n"
+        "Aucun widget d'upload n'est disponible pour des raisons de sécurité."
+    )
+    st.stop()
+
+# Registre des comptes, unique et partagé entre les sessions : chaque jeu est chargé
+# à sa première sélection puis surveillé ; les nouvelles versions (posts, cube
+# journalier, index des filtres) sont construites en arrière-plan. Les comptes
+# ajoutés ou retirés de DATA_DIR sont mis à jour sans recharger les autres.
+@st.cache_resource(on_release=DatasetRegistry.close)
+def get_registry():
+    """Registre des jeux de données disponibles"""
+    return DatasetRegistry({})
+
+registry = get_registry()
+registry.update_sources(data_sources)
+
+# Base SQL embarquée d'une version des données, construite à la première requête
+# avec le moteur SQL ; fermée quand la version sort du cache
+@st.cache_resource(max_entries=2, on_release=SqlBackend.close)
+def get_sql_backend(fingerprint, _df):
+    """Base SQL des posts enrichis d'une version des données"""
+    return SqlBackend(_df)
+
+# Sélection du compte (uniquement quand plusieurs jeux sont disponibles)
+account = registry.names()[0]
+if len(registry.names()) > 1:
+    with st.sidebar:
+        account = st.selectbox("Compte", registry.names(), key="account")
+
+# Version lue une seule fois : toute l'exécution du script utilise les mêmes données.
+# L'empreinte (chemin, mtime, taille, hash) identifie la version dans les clés de cache
+with stage('chargement'):
+    if registry.is_loaded(account):
+        dataset = registry.get(account)
+    else:
+        with st.spinner("Chargement des données..."):
+            dataset = registry.get(account)
+data_fingerprint = dataset.fingerprint
+df = dataset.df
+filter_index = dataset.filter_index
+rollup_index = dataset.rollup_index
 
 # Contrôles qualité
 warnings = []
@@ -1088,7 +1183,7 @@ if missing_columns:
     warnings.append(f"Colonnes manquantes : {', '.join(missing_columns)}")
 
 # Vérification des valeurs manquantes
-na_cols = df[numeric_columns].isna().sum()
+na_cols = df[NUMERIC_COLUMNS].isna().sum()
 na_cols = na_cols[na_cols > 0]
 if not na_cols.empty:
     pass  # On ignore cet avertissement car normal d'avoir des valeurs manquantes
@@ -1113,13 +1208,26 @@ for col in ['vues', 'likes', 'commentaires', 'partages', 'enregistrements']:
 if missing_columns:
     st.warning(warnings[0])
 
-# Création des DataFrames spécifiques
-df_reels = df[df['type'] == 'Reels'].copy()
-df_photos = df[df['type'] == 'Photo'].copy()
-df_carousel = df[df['type'] == 'Carrousel'].copy()
+# Valeurs numériques illisibles relevées au chargement
+parse_error_count = df.attrs.get('parse_error_count', 0)
+if parse_error_count:
+    with st.expander(f"⚠️ {parse_error_count} valeur(s) numérique(s) illisible(s) dans le fichier de données"):
+        st.dataframe(
+            pd.DataFrame(df.attrs['parse_errors']).rename(
+                columns={'ligne': 'Ligne', 'colonne': 'Colonne', 'valeur': 'Valeur'}),
+            hide_index=True,
+            use_container_width=True
+        )
+
+# Dernier rechargement du fichier en échec : la version précédente reste servie
+reload_error = registry.last_error(account)
+if reload_error:
+    with st.expander("⚠️ Le fichier de données a été modifié mais n'a pas pu être rechargé : "
+                     "les données affichées sont celles de la version précédente"):
+        st.code(reload_error, language=None)
 
 # Sidebar - Filtres globaux
-with st.sidebar:
+with st.sidebar, stage("filtres"):
     st.header("Filtres")
     
     # Filtre de dates
@@ -1133,38 +1241,64 @@ with st.sidebar:
         format="DD/MM/YYYY"
     )
     
+    # Les filtres combinent des masques de bits ; les lignes ne sont extraites qu'une fois
+    selection = Selection(filter_index)
+    
     if len(date_range) == 2:
         start_date, end_date = date_range
-        mask_date = (df['date'].dt.date >= start_date) & (df['date'].dt.date <= end_date)
-        df = df[mask_date]
+        selection.restrict_dates(start_date, end_date)
     
-    # Filtre de période
-    periodes = ['Tous'] + sorted(df['periode'].unique().tolist())
+    # Filtre de période (valeurs présentes dans la plage de dates)
+    periodes = ['Tous'] + sorted(filter_index.values('periode', within=selection.bits))
     periode_filter = st.selectbox("Période", periodes)
     if periode_filter != 'Tous':
-        df = df[df['periode'] == periode_filter]
+        selection.restrict('periode', [periode_filter])
     
     # Filtre de contenu
-    contenus = ['Tous'] + sorted(df['contenu'].unique().tolist())
+    contenus = ['Tous'] + sorted(filter_index.values('contenu', within=selection.bits))
     contenu_filter = st.selectbox("Contenu", contenus)
     if contenu_filter != 'Tous':
-        df = df[df['contenu'] == contenu_filter]
+        selection.restrict('contenu', [contenu_filter])
     
     # Filtre de collaboration
     collab_filter = st.selectbox("Collaboration", ['Tous', 'Oui', 'Non'])
     if collab_filter != 'Tous':
-        df = df[df['collab'] == (collab_filter == 'Oui')]
+        selection.restrict('collab', [collab_filter == 'Oui'])
     
     # Filtre de hashtags
     hashtags_range = st.slider("Nombre de hashtags", 0, 3, (0, 3))
-    df = df[df['hashtags'].between(hashtags_range[0], hashtags_range[1])]
+    selection.restrict('hashtags', [
+        n for n in filter_index.values('hashtags')
+        if hashtags_range[0] <= n <= hashtags_range[1]
+    ])
     
     # Filtre d'heure
     st.subheader("Période de la journée")
-    heures_bin = ['Tous'] + ['Nuit', 'Matin', 'Midi', 'Après-midi', 'Soir', 'Tard']
+    heures_bin = ['Tous'] + HEURE_BIN_LABELS
     heure_filter = st.selectbox("Moment de la journée", heures_bin)
     if heure_filter != 'Tous':
-        df = df[df['heure_bin'] == heure_filter]
+        selection.restrict('heure_bin', [heure_filter])
+    
+    # Moteur des filtres et agrégations : masques de bits et pandas, ou requêtes SQL
+    engine = st.selectbox("Moteur de calcul", ['pandas', SQL_ENGINE], key="engine")
+    if engine == SQL_ENGINE:
+        sql = get_sql_backend(data_fingerprint, _df=filter_index.df).bind(selection)
+        row_mask = filter_index.from_positions(sql.positions())
+    else:
+        sql = None
+        row_mask = selection.bits
+    
+    # Extraction unique des lignes retenues
+    df = filter_index.select(row_mask)
+    
+    # Posts par type, extraits de la même sélection à la première utilisation
+    type_views = TypeViews(filter_index, row_mask)
+    
+    # Clé des filtres actifs pour les agrégats mis en cache
+    selection_key = (data_fingerprint, filter_index.key(row_mask), engine)
+    
+    # Mêmes filtres appliqués au cube journalier
+    rollup_mask = selection.bits_for(rollup_index)
     
     # Séparateur
     st.markdown("---")
@@ -1241,13 +1375,14 @@ with col3:
         f"{df['pct_non_followers'].mean()*100:.1f}%"
     )
 
-# Création des onglets
-overview, reels, photos, carousel, charts, explorer = st.tabs([
-    "Overview", "Reels", "Photos", "Carrousel", "Charts", "Explorer"
-])
+# Navigation entre les sections : contrairement à st.tabs, qui exécute le contenu
+# de tous les onglets, seule la section choisie est calculée et affichée
+SECTIONS = ["Overview", "Reels", "Photos", "Carrousel", "Charts", "Explorer"]
+section = st.radio("Section", SECTIONS, horizontal=True, key="section", label_visibility="collapsed")
 
 # Onglet Overview
-with overview:
+def render_overview():
+    """Onglet Overview"""
     st.header("Vue d'ensemble")
     
     # KPI Cards
@@ -1294,7 +1429,7 @@ with overview:
         st.metric("Taux d'engagement médian", f"{median_engagement*100:.1f}%")
     
     with col2:
-        median_attraction = df_reels['taux_attraction'].median()
+        median_attraction = type_views['Reels']['taux_attraction'].median()
         st.metric("Taux d'attraction médian", f"{median_attraction*100:.1f}%")
     
     with col3:
@@ -1303,111 +1438,24 @@ with overview:
     
     # Séries temporelles
     st.subheader("Évolution temporelle")
-    
-    # Sélection des métriques à afficher
-    metrics = {
-        'Vues': 'vues',
-        'Likes': 'likes',
-        'Commentaires': 'commentaires',
-        'Partages': 'partages',
-        'Enregistrements': 'enregistrements'
-    }
-    
-    col1, col2 = st.columns([2, 1])
-    with col1:
-        selected_metrics = st.multiselect(
-            "Métriques à afficher",
-            options=list(metrics.keys()),
-            default=['Vues', 'Likes']
-        )
-    
-    with col2:
-        # Sélection de la résolution temporelle
-        resolution = st.selectbox(
-            "Résolution",
-            options=['Jour', 'Semaine', 'Mois'],
-            index=0
-        )
-        
-        # Sélection de l'agrégation
-        aggregation = st.selectbox(
-            "Agrégation",
-            options=['Somme', 'Moyenne'],
-            index=0
-        )
-    
-    if selected_metrics:
-        # Préparation des données pour le graphique
-        df_plot = df.copy()
-        
-        # Groupement selon la résolution
-        if resolution == 'Jour':
-            df_plot['period'] = df_plot['date']
-        elif resolution == 'Semaine':
-            df_plot['period'] = df_plot['date'] - pd.to_timedelta(df_plot['date'].dt.dayofweek, unit='D')
-        else:  # Mois
-            df_plot['period'] = df_plot['date'].dt.to_period('M').astype(str)
-        
-        # Création du graphique avec Plotly
-        fig = px.line(
-            template="plotly_dark"
-        )
-        
-        # Configuration du thème sombre uniforme
-        fig = configure_plotly_theme(fig, "Évolution des métriques dans le temps")
-        
-        # Ajout des séries
-        for metric_name in selected_metrics:
-            metric_col = metrics[metric_name]
-            
-            # Agrégation des données
-            if aggregation == 'Somme':
-                grouped_data = df_plot.groupby('period')[metric_col].sum()
-            else:  # Moyenne
-                grouped_data = df_plot.groupby('period')[metric_col].mean()
-            
-            # Ajout de la série au graphique
-            fig.add_scatter(
-                x=grouped_data.index,
-                y=grouped_data.values,
-                name=metric_name,
-                hovertemplate="%{y:,.0f}"
-            )
-        
-        # Configuration du graphique
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Valeur",
-            hovermode='x unified',
-            showlegend=True,
-            height=500
-        )
-        
-        # Affichage du graphique
-        st.plotly_chart(fig, use_container_width=True)
+    render_time_series(None, None, "Évolution des métriques dans le temps", 500)
     
     # Heatmap Jour × Heure
     st.subheader("Distribution des vues par jour et heure")
     
-    # Préparation des données pour la heatmap
-    df_heatmap = df.copy()
-    
-    # Extraction de l'heure (conversion en entier)
-    df_heatmap['hour'] = df_heatmap['heure'].apply(
-        lambda x: int(float(str(x).split(':')[0])) if pd.notna(x) and ':' in str(x)
-        else int(float(x)) if pd.notna(x)
-        else None
-    )
-    
-    # Création de la matrice pour la heatmap
-    heatmap_data = pd.pivot_table(
-        df_heatmap,
-        values='vues',
-        index='jour_semaine',
-        columns='hour',
-        aggfunc='median',
-        fill_value=0
-    )
+    # Création de la matrice pour la heatmap (colonne 'hour' calculée au chargement)
+    if sql is not None:
+        heatmap_data = sql.heatmap('vues')
+    else:
+        heatmap_data = pd.pivot_table(
+            df,
+            values='vues',
+            index='jour_semaine',
+            columns='hour',
+            aggfunc='median',
+            fill_value=0,
+            observed=True
+        )
     
     # Réorganisation des jours dans l'ordre
     correct_order = ['Lun', 'Mar', 'Mer', 'Jeu', 'Ven', 'Sam', 'Dim']
@@ -1431,36 +1479,22 @@ with overview:
     )
     
     # Affichage de la heatmap
-    st.plotly_chart(fig_heatmap, use_container_width=True) 
+    render_chart(fig_heatmap, use_container_width=True) 
 
-with reels:
+def render_reels():
+    """Onglet Reels"""
     st.header("Analyse des Reels")
     
+    # Reels retenus par les filtres de la barre latérale
+    df_reels = type_views['Reels']
+    
     if len(df_reels) == 0:
         st.warning("Aucun Reel ne correspond aux filtres sélectionnés.")
     else:
         # Informations sur les Reels
         st.subheader("Informations sur les Reels")
         
-        # Conversion de la durée en secondes
-        def convert_to_seconds(duree):
-            if pd.isna(duree):
-                return None
-            try:
-                if '.' in str(duree):
-                    minutes, seconds = map(float, str(duree).split('.'))
-                    return minutes * 60 + seconds
-                elif ':' in str(duree):
-                    minutes, seconds = map(float, str(duree).split(':'))
-                    return minutes * 60 + seconds
-                return float(duree) * 60  # Si c'est juste un nombre, on considère que ce sont des minutes
-            except:
-                return None
-
-        # Calcul des durées en secondes
-        df_reels['duree_secondes'] = df_reels['duree_reels'].apply(convert_to_seconds)
-        
-        # Calculs des statistiques
+        # Calculs des statistiques (durées en secondes calculées au chargement)
         duree_moyenne = df_reels['duree_secondes'].mean()
         duree_mediane = df_reels['duree_secondes'].median()
         nb_reels_plus_1min = len(df_reels[df_reels['duree_secondes'] > 60])
@@ -1529,100 +1563,11 @@ with reels:
         
         # Séries temporelles des Reels
         st.subheader("Évolution temporelle des Reels")
-        
-        # Sélection des métriques à afficher
-        metrics = {
-            'Vues': 'vues',
-            'Likes': 'likes',
-            'Commentaires': 'commentaires',
-            'Partages': 'partages',
-            'Enregistrements': 'enregistrements'
-        }
-        
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            selected_metrics = st.multiselect(
-                "Métriques à afficher",
-                options=list(metrics.keys()),
-                default=['Vues', 'Likes'],
-                key="reels_metrics"
-            )
-        
-        with col2:
-            # Sélection de la résolution temporelle
-            resolution = st.selectbox(
-                "Résolution",
-                options=['Jour', 'Semaine', 'Mois'],
-                index=0,
-                key="reels_resolution"
-            )
-            
-            # Sélection de l'agrégation
-            aggregation = st.selectbox(
-                "Agrégation",
-                options=['Somme', 'Moyenne'],
-                index=0,
-                key="reels_aggregation"
-            )
-        
-        if selected_metrics:
-            # Préparation des données pour le graphique
-            df_plot = df_reels.copy()
-            
-            # Groupement selon la résolution
-            if resolution == 'Jour':
-                df_plot['period'] = df_plot['date']
-            elif resolution == 'Semaine':
-                df_plot['period'] = df_plot['date'] - pd.to_timedelta(df_plot['date'].dt.dayofweek, unit='D')
-            else:  # Mois
-                df_plot['period'] = df_plot['date'].dt.to_period('M').astype(str)
-            
-            # Création du graphique avec Plotly
-            fig = px.line(template="plotly_dark")
-            
-            # Ajout des séries
-            for metric_name in selected_metrics:
-                metric_col = metrics[metric_name]
-                
-                # Agrégation des données
-                if aggregation == 'Somme':
-                    grouped_data = df_plot.groupby('period')[metric_col].sum()
-                else:  # Moyenne
-                    grouped_data = df_plot.groupby('period')[metric_col].mean()
-                
-                # Ajout de la série au graphique
-                fig.add_scatter(
-                    x=grouped_data.index,
-                    y=grouped_data.values,
-                    name=metric_name,
-                    hovertemplate="%{y:,.0f}"
-                )
-            
-            # Configuration du thème sombre
-            fig = configure_plotly_theme(fig, "Évolution des métriques dans le temps (Reels)")
-            fig.update_layout(
-                xaxis_title="Date",
-                yaxis_title="Valeur",
-                hovermode='x unified',
-                showlegend=True,
-                height=400
-            )
-            
-            # Affichage du graphique
-            st.plotly_chart(fig, use_container_width=True)
+        render_time_series('Reels', "reels", "Évolution des métriques dans le temps (Reels)", 400)
         
         # Analyse durée vs KPI
         st.subheader("Impact de la durée sur les performances")
         
-        # Conversion de la durée en secondes
-        df_reels['duree_secondes'] = df_reels['duree_reels'].apply(
-            lambda x: int(str(x).split('.')[0])*60 + int(str(x).split('.')[1]) 
-            if pd.notna(x) and '.' in str(x)
-            else int(float(str(x).split(':')[0])*60 + float(str(x).split(':')[1])) 
-            if pd.notna(x) and ':' in str(x)
-            else None
-        )
-        
         # Sélection du KPI à analyser
         kpi_options = {
             "Vues": "vues",
@@ -1631,29 +1576,8 @@ with reels:
             "% Non-followers": "pct_non_followers"
         }
         
-        selected_kpi = st.selectbox(
-            "KPI à analyser",
-            options=list(kpi_options.keys()),
-            key="reels_kpi"
-        )
-        
-        # Modification des scatter plots pour retirer LOWESS
-        fig_scatter = px.scatter(
-            df_reels,
-            x='duree_secondes',
-            y=kpi_options[selected_kpi],
-            labels={
-                'duree_secondes': 'Durée (secondes)',
-                kpi_options[selected_kpi]: selected_kpi
-            },
-            template="plotly_dark"
-        )
-        
-        # Configuration du thème sombre
-        fig_scatter = configure_plotly_theme(fig_scatter, f"Relation entre la durée et {selected_kpi}")
-        fig_scatter.update_layout(height=400)
-        
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        render_kpi_scatter(df_reels, 'duree_secondes', 'Durée (secondes)', kpi_options, "reels_kpi",
+                           "Relation entre la durée et")
         
         # Analyse par segments
         st.subheader("Analyse par segments")
@@ -1665,60 +1589,15 @@ with reels:
             "Hashtags": "hashtags"
         }
         
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            selected_segment = st.selectbox(
-                "Segment à analyser",
-                options=list(segment_options.keys()),
-                key="reels_segment"
-            )
-        
-        with col2:
-            selected_metric = st.selectbox(
-                "Métrique à analyser",
-                options=list(kpi_options.keys()),
-                key="reels_segment_metric"
-            )
-        
-        # Calcul des moyennes par segment
-        segment_col = segment_options[selected_segment]
-        metric_col = kpi_options[selected_metric]
-        
-        segment_means = df_reels.groupby(segment_col)[metric_col].mean().sort_values(ascending=False)
-        
-        # Création du graphique en barres
-        fig_bars = px.bar(
-            segment_means,
-            template="plotly_dark"
-        )
-        
-        # Configuration du thème sombre
-        fig_bars = configure_plotly_theme(fig_bars, f"Moyenne de {selected_metric} par {selected_segment}")
-        fig_bars.update_layout(
-            xaxis_title=selected_segment,
-            yaxis_title=f"Moyenne de {selected_metric}",
-            height=400,
-            showlegend=False
-        )
-        
-        # Formatage des valeurs selon le type de métrique
-        if "taux" in metric_col.lower() or "pct" in metric_col.lower():
-            fig_bars.update_traces(
-                hovertemplate="%{y:.1%}"
-            )
-            fig_bars.update_layout(
-                yaxis_tickformat=".1%"
-            )
-        else:
-            fig_bars.update_traces(
-                hovertemplate="%{y:,.0f}"
-            )
-        
-        st.plotly_chart(fig_bars, use_container_width=True) 
+        render_segment_bars('Reels', df_reels, segment_options, kpi_options, "reels", ",.0f")
 
-with photos:
+def render_photos():
+    """Onglet Photos"""
     st.header("Analyse des Photos")
     
+    # Photos retenus par les filtres de la barre latérale
+    df_photos = type_views['Photo']
+    
     if len(df_photos) == 0:
         st.warning("Aucune Photo ne correspond aux filtres sélectionnés.")
     else:
@@ -1794,93 +1673,15 @@ with photos:
         
         # Séries temporelles des Photos
         st.subheader("Évolution temporelle des Photos")
-        
-        # Sélection des métriques à afficher
-        metrics = {
-            'Vues': 'vues',
-            'Likes': 'likes',
-            'Commentaires': 'commentaires',
-            'Partages': 'partages',
-            'Enregistrements': 'enregistrements'
-        }
-        
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            selected_metrics = st.multiselect(
-                "Métriques à afficher",
-                options=list(metrics.keys()),
-                default=['Vues', 'Likes'],
-                key="photos_metrics"
-            )
-        
-        with col2:
-            # Sélection de la résolution temporelle
-            resolution = st.selectbox(
-                "Résolution",
-                options=['Jour', 'Semaine', 'Mois'],
-                index=0,
-                key="photos_resolution"
-            )
-            
-            # Sélection de l'agrégation
-            aggregation = st.selectbox(
-                "Agrégation",
-                options=['Somme', 'Moyenne'],
-                index=0,
-                key="photos_aggregation"
-            )
-        
-        if selected_metrics:
-            # Préparation des données pour le graphique
-            df_plot = df_photos.copy()
-            
-            # Groupement selon la résolution
-            if resolution == 'Jour':
-                df_plot['period'] = df_plot['date']
-            elif resolution == 'Semaine':
-                df_plot['period'] = df_plot['date'] - pd.to_timedelta(df_plot['date'].dt.dayofweek, unit='D')
-            else:  # Mois
-                df_plot['period'] = df_plot['date'].dt.to_period('M').astype(str)
-            
-            # Création du graphique avec Plotly
-            fig = px.line(template="plotly_dark")
-            
-            # Ajout des séries
-            for metric_name in selected_metrics:
-                metric_col = metrics[metric_name]
-                
-                # Agrégation des données
-                if aggregation == 'Somme':
-                    grouped_data = df_plot.groupby('period')[metric_col].sum()
-                else:  # Moyenne
-                    grouped_data = df_plot.groupby('period')[metric_col].mean()
-                
-                # Ajout de la série au graphique
-                fig.add_scatter(
-                    x=grouped_data.index,
-                    y=grouped_data.values,
-                    name=metric_name,
-                    hovertemplate="%{y:,.0f}"
-                )
-            
-            # Configuration du thème sombre
-            fig = configure_plotly_theme(fig, "Évolution des métriques dans le temps (Photos)")
-            fig.update_layout(
-                xaxis_title="Date",
-                yaxis_title="Valeur",
-                hovermode='x unified',
-                showlegend=True,
-                height=400
-            )
-            
-            # Affichage du graphique
-            st.plotly_chart(fig, use_container_width=True)
+        render_time_series('Photo', "photos", "Évolution des métriques dans le temps (Photos)", 400)
         
         # Distribution des enregistrements pour 1000 vues
         st.subheader("Distribution des enregistrements")
         
         # Calcul du taux d'enregistrement pour 1000 vues
-        df_photos['enregistrements_1k'] = (df_photos['enregistrements'] / df_photos['vues']) * 1000
+        df_photos = df_photos.assign(
+            enregistrements_1k=(df_photos['enregistrements'] / df_photos['vues']) * 1000
+        )
         
         # Création de l'histogramme
         fig_hist = px.histogram(
@@ -1899,14 +1700,12 @@ with photos:
             height=400
         )
         
-        st.plotly_chart(fig_hist, use_container_width=True)
+        render_chart(fig_hist, use_container_width=True)
         
         # Analyse par segments
         st.subheader("Analyse par segments")
         
-        # Sélection du segment et de la métrique
-        col1, col2 = st.columns([2, 1])
-        
+        # Sélection du segment
         segment_options = {
             "Contenu": "contenu",
             "Période": "periode",
@@ -1921,59 +1720,15 @@ with photos:
             "Enregistrements/1k vues": "enregistrements_1k"
         }
         
-        with col1:
-            selected_segment = st.selectbox(
-                "Segment à analyser",
-                options=list(segment_options.keys()),
-                key="photos_segment"
-            )
-        
-        with col2:
-            selected_metric = st.selectbox(
-                "Métrique à analyser",
-                options=list(kpi_options.keys()),
-                key="photos_segment_metric"
-            )
-        
-        # Calcul des moyennes par segment
-        segment_col = segment_options[selected_segment]
-        metric_col = kpi_options[selected_metric]
-        
-        segment_means = df_photos.groupby(segment_col)[metric_col].mean().sort_values(ascending=False)
-        
-        # Création du graphique en barres
-        fig_bars = px.bar(
-            segment_means,
-            template="plotly_dark"
-        )
-        
-        # Configuration du thème sombre
-        fig_bars = configure_plotly_theme(fig_bars, f"Moyenne de {selected_metric} par {selected_segment}")
-        fig_bars.update_layout(
-            xaxis_title=selected_segment,
-            yaxis_title=f"Moyenne de {selected_metric}",
-            height=400,
-            showlegend=False
-        )
-        
-        # Formatage des valeurs selon le type de métrique
-        if "taux" in metric_col.lower() or "pct" in metric_col.lower():
-            fig_bars.update_traces(
-                hovertemplate="%{y:.1%}"
-            )
-            fig_bars.update_layout(
-                yaxis_tickformat=".1%"
-            )
-        else:
-            fig_bars.update_traces(
-                hovertemplate="%{y:,.1f}"
-            )
-        
-        st.plotly_chart(fig_bars, use_container_width=True) 
+        render_segment_bars('Photo', df_photos, segment_options, kpi_options, "photos", ",.1f")
 
-with carousel:
+def render_carousel():
+    """Onglet Carrousel"""
     st.header("Analyse des Carrousels")
     
+    # Carrousels retenus par les filtres de la barre latérale
+    df_carousel = type_views['Carrousel']
+    
     if len(df_carousel) == 0:
         st.warning("Aucun Carrousel ne correspond aux filtres sélectionnés.")
     else:
@@ -2050,87 +1805,7 @@ with carousel:
         
         # Séries temporelles des Carrousels
         st.subheader("Évolution temporelle des Carrousels")
-        
-        # Sélection des métriques à afficher
-        metrics = {
-            'Vues': 'vues',
-            'Likes': 'likes',
-            'Commentaires': 'commentaires',
-            'Partages': 'partages',
-            'Enregistrements': 'enregistrements'
-        }
-        
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            selected_metrics = st.multiselect(
-                "Métriques à afficher",
-                options=list(metrics.keys()),
-                default=['Vues', 'Likes'],
-                key="carousel_metrics"
-            )
-        
-        with col2:
-            # Sélection de la résolution temporelle
-            resolution = st.selectbox(
-                "Résolution",
-                options=['Jour', 'Semaine', 'Mois'],
-                index=0,
-                key="carousel_resolution"
-            )
-            
-            # Sélection de l'agrégation
-            aggregation = st.selectbox(
-                "Agrégation",
-                options=['Somme', 'Moyenne'],
-                index=0,
-                key="carousel_aggregation"
-            )
-        
-        if selected_metrics:
-            # Préparation des données pour le graphique
-            df_plot = df_carousel.copy()
-            
-            # Groupement selon la résolution
-            if resolution == 'Jour':
-                df_plot['period'] = df_plot['date']
-            elif resolution == 'Semaine':
-                df_plot['period'] = df_plot['date'] - pd.to_timedelta(df_plot['date'].dt.dayofweek, unit='D')
-            else:  # Mois
-                df_plot['period'] = df_plot['date'].dt.to_period('M').astype(str)
-            
-            # Création du graphique avec Plotly
-            fig = px.line(template="plotly_dark")
-            
-            # Ajout des séries
-            for metric_name in selected_metrics:
-                metric_col = metrics[metric_name]
-                
-                # Agrégation des données
-                if aggregation == 'Somme':
-                    grouped_data = df_plot.groupby('period')[metric_col].sum()
-                else:  # Moyenne
-                    grouped_data = df_plot.groupby('period')[metric_col].mean()
-                
-                # Ajout de la série au graphique
-                fig.add_scatter(
-                    x=grouped_data.index,
-                    y=grouped_data.values,
-                    name=metric_name,
-                    hovertemplate="%{y:,.0f}"
-                )
-            
-            # Configuration du thème sombre
-            fig = configure_plotly_theme(fig, "Évolution des métriques dans le temps (Carrousels)")
-            fig.update_layout(
-                xaxis_title="Date",
-                yaxis_title="Valeur",
-                hovermode='x unified',
-                showlegend=True,
-                height=400
-            )
-            
-            # Affichage du graphique
-            st.plotly_chart(fig, use_container_width=True)
+        render_time_series('Carrousel', "carousel", "Évolution des métriques dans le temps (Carrousels)", 400)
         
         # Analyse nombre d'images vs KPI
         st.subheader("Impact du nombre d'images sur les performances")
@@ -2143,93 +1818,26 @@ with carousel:
             "% Non-followers": "pct_non_followers"
         }
         
-        selected_kpi = st.selectbox(
-            "KPI à analyser",
-            options=list(kpi_options.keys()),
-            key="carousel_kpi"
-        )
-        
-        # Modification des scatter plots pour retirer LOWESS
-        fig_scatter = px.scatter(
-            df_carousel,
-            x='nb_images_carousel',
-            y=kpi_options[selected_kpi],
-            labels={
-                'nb_images_carousel': "Nombre d'images",
-                kpi_options[selected_kpi]: selected_kpi
-            },
-            template="plotly_dark"
-        )
-        
-        # Configuration du thème sombre
-        fig_scatter = configure_plotly_theme(fig_scatter, f"Relation entre le nombre d'images et {selected_kpi}")
-        fig_scatter.update_layout(height=400)
-        
-        st.plotly_chart(fig_scatter, use_container_width=True)
+        render_kpi_scatter(df_carousel, 'nb_images_carousel', "Nombre d'images", kpi_options, "carousel_kpi",
+                           "Relation entre le nombre d'images et")
         
         # Analyse par segments
         st.subheader("Analyse par segments")
         
-        # Sélection du segment et de la métrique
-        col1, col2 = st.columns([2, 1])
-        
+        # Sélection du segment
         segment_options = {
             "Contenu": "contenu",
             "Période": "periode",
             "Hashtags": "hashtags"
         }
         
-        with col1:
-            selected_segment = st.selectbox(
-                "Segment à analyser",
-                options=list(segment_options.keys()),
-                key="carousel_segment"
-            )
-        
-        with col2:
-            selected_metric = st.selectbox(
-                "Métrique à analyser",
-                options=list(kpi_options.keys()),
-                key="carousel_segment_metric"
-            )
-        
-        # Calcul des moyennes par segment
-        segment_col = segment_options[selected_segment]
-        metric_col = kpi_options[selected_metric]
-        
-        segment_means = df_carousel.groupby(segment_col)[metric_col].mean().sort_values(ascending=False)
-        
-        # Création du graphique en barres
-        fig_bars = px.bar(
-            segment_means,
-            template="plotly_dark"
-        )
-        
-        # Configuration du thème sombre
-        fig_bars = configure_plotly_theme(fig_bars, f"Moyenne de {selected_metric} par {selected_segment}")
-        fig_bars.update_layout(
-            xaxis_title=selected_segment,
-            yaxis_title=f"Moyenne de {selected_metric}",
-            height=400,
-            showlegend=False
-        )
-        
-        # Formatage des valeurs selon le type de métrique
-        if "taux" in metric_col.lower() or "pct" in metric_col.lower():
-            fig_bars.update_traces(
-                hovertemplate="%{y:.1%}"
-            )
-            fig_bars.update_layout(
-                yaxis_tickformat=".1%"
-            )
-        else:
-            fig_bars.update_traces(
-                hovertemplate="%{y:,.0f}"
-            )
-        
-        st.plotly_chart(fig_bars, use_container_width=True) 
+        render_segment_bars('Carrousel', df_carousel, segment_options, kpi_options, "carousel", ",.0f")
 
-with charts:
+# Onglet Charts : le constructeur de graphique est un fragment, ses contrôles ne
+# réexécutent que l'onglet
+@st.fragment
+def render_charts():
+    """Onglet Charts"""
     st.header("Graphiques personnalisables")
     
     # Définition des métriques disponibles
@@ -2258,12 +1866,14 @@ with charts:
         "Hashtags": "hashtags"
     }
     
-    # Définition des combinaisons de segments
+    # Définition des combinaisons de segments (tout croisement reste possible
+    # via « Combinaison personnalisée »)
     segment_combinations = {
-        "Type × Contenu": ["type", "contenu"],
-        "Type × Période": ["type", "periode"],
-        "Contenu × Période": ["contenu", "periode"]
+        "Type × Contenu": ["Type", "Contenu"],
+        "Type × Période": ["Type", "Période"],
+        "Contenu × Période": ["Contenu", "Période"]
     }
+    custom_combination = "Combinaison personnalisée"
     
     # Configuration du graphique
     st.subheader("Configuration")
@@ -2280,12 +1890,26 @@ with charts:
         )
         
         # Sélection du segment
-        segment_options = list(segments.keys()) + list(segment_combinations.keys())
+        segment_options = list(segments.keys()) + list(segment_combinations.keys()) + [custom_combination]
         selected_segment = st.selectbox(
             "Segment d'analyse",
             options=segment_options,
             key="custom_segment"
         )
+        
+        # Segments à croiser
+        if selected_segment == custom_combination:
+            segment_names = st.multiselect(
+                "Segments à croiser",
+                options=list(segments.keys()),
+                default=["Type", "Contenu"],
+                key="custom_segment_combination"
+            )
+            selected_segment = " × ".join(segment_names)
+        elif selected_segment in segment_combinations:
+            segment_names = segment_combinations[selected_segment]
+        else:
+            segment_names = [selected_segment]
     
     with col2:
         # Type de graphique
@@ -2303,28 +1927,26 @@ with charts:
         )
     
     if selected_metrics and selected_segment:
-        # Préparation des données
-        df_plot = df.copy()
-        
-        # Gestion des segments combinés
-        if selected_segment in segment_combinations:
-            segment_cols = segment_combinations[selected_segment]
-            df_plot['segment'] = df_plot[segment_cols].apply(lambda x: ' × '.join(x.astype(str)), axis=1)
+        # Statistiques par segment, partagées entre les exécutions : tous les segments
+        # simples en un passage, chaque croisement à sa première demande
+        segment_cols = [segments[name] for name in segment_names]
+        if len(segment_cols) == 1:
+            stats = cached_segment_stats(selection_key, None, tuple(segments.values()),
+                                         tuple(metrics.values()), _source=sql or df)[segment_cols[0]]
         else:
-            segment_cols = [segments[selected_segment]]
-            df_plot['segment'] = df_plot[segments[selected_segment]]
+            combination = tuple(segment_cols)
+            stats = cached_segment_stats(selection_key, None, (combination,),
+                                         tuple(metrics.values()), _source=sql or df)[combination]
         
         # Création du DataFrame des agrégats
         agg_data = []
         
         for metric_name in selected_metrics:
             metric_col = metrics[metric_name]
+            stat = 'mean' if aggregation == "Moyenne" else 'sum'
             
-            # Calcul des agrégats
-            if aggregation == "Moyenne":
-                grouped = df_plot.groupby('segment')[metric_col].mean()
-            else:  # Somme
-                grouped = df_plot.groupby('segment')[metric_col].sum()
+            # Lecture des agrégats
+            grouped = segment_series(stats, metric_col, stat).rename_axis('segment')
             
             # Conversion en DataFrame
             df_agg = grouped.reset_index()
@@ -2391,21 +2013,19 @@ with charts:
             fig.update_layout(yaxis_tickformat=".1%")
         
         # Affichage du graphique
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(fig, use_container_width=True)
         
         # Export des données
         st.subheader("Exporter les données")
         
-        # Préparation du CSV
-        csv = df_agg.to_csv(index=False).encode('utf-8')
-        
-        # Bouton de téléchargement
+        # Bouton de téléchargement : CSV généré au clic seulement, sans réexécution
         st.download_button(
             "Télécharger les données (CSV)",
-            csv,
+            lambda: df_agg.to_csv(index=False).encode('utf-8'),
             "agregats.csv",
             "text/csv",
-            key="download_custom_chart"
+            key="download_custom_chart",
+            on_click="ignore"
         ) 
 
 # Style pour l'explorateur de données
@@ -2471,7 +2091,8 @@ EXPLORER_COLUMNS = [
 ]
 
 # Onglet Explorer
-with explorer:
+def render_explorer():
+    """Onglet Explorer"""
     st.header("Explorateur de données")
     
     # Filtres
@@ -2498,18 +2119,16 @@ with explorer:
             key='explorer_search'
         )
 
-    # Application des filtres
-    filtered_df = df.copy()
+    # Application des filtres (df est trié par date : la plage est une tranche)
+    filtered_df = df
+
+    if len(date_range) == 2:
+        lo, hi = date_bounds(filtered_df['date'].to_numpy(dtype='datetime64[ns]'), *date_range)
+        filtered_df = filtered_df.iloc[lo:hi]
 
     if type_filter:
         filtered_df = filtered_df[filtered_df['type'].isin(type_filter)]
 
-    if len(date_range) == 2:
-        filtered_df = filtered_df[
-            (filtered_df['date'].dt.date >= date_range[0]) &
-            (filtered_df['date'].dt.date <= date_range[1])
-        ]
-
     if search_term:
         filtered_df = filtered_df[
             filtered_df['titre'].str.contains(search_term, case=False, na=False)
@@ -2605,65 +2224,78 @@ with explorer:
     
     # Export des données complètes
     st.subheader("Exporter les données")
-    
-    # Préparation du DataFrame pour l'export
-    export_df = df.copy()
-    
-    # Renommage des colonnes pour l'export
-    export_columns = {
-        'date': 'Date',
-        'heure': 'Heure',
-        'periode': 'Période',
-        'type': 'Type',
-        'titre': 'Titre',
-        'lien': 'Lien',
-        'contenu': 'Contenu',
-        'collab': 'Collaboration',
-        'duree_reels': 'Durée Reels',
-        'nb_images_carousel': 'Nombre Images Carrousel',
-        'vues': 'Vues',
-        'vues_followers': 'Vues Followers',
-        'vues_non_followers': 'Vues Non-Followers',
-        'nb_interactions': 'Interactions',
-        'likes': 'Likes',
-        'commentaires': 'Commentaires',
-        'partages': 'Partages',
-        'enregistrements': 'Enregistrements',
-        'activite_profil': 'Activité Profil',
-        'visites_profil': 'Visites Profil',
-        'followers_plus': 'Nouveaux Followers',
-        'clics_externes': 'Clics Externes',
-        'hashtags': 'Hashtags',
-        'jour_semaine': 'Jour de la Semaine',
-        'heure_bin': 'Période de la Journée',
-        'taux_engagement': "Taux d'Engagement",
-        'taux_attraction': "Taux d'Attraction",
-        'profile_visit_rate': 'Taux de Visite Profil',
-        'follow_rate': 'Taux de Follow',
-        'external_ctr': 'Taux de Clic Externe',
-        'pct_non_followers': '% Non-Followers'
-    }
-    
-    export_df = export_df.rename(columns=export_columns)
-    
-    # Formatage des colonnes pour l'export
-    export_df['Date'] = export_df['Date'].dt.strftime('%Y-%m-%d')
-    export_df['Collaboration'] = export_df['Collaboration'].map({True: 'Oui', False: 'Non'})
-    
-    # Conversion des taux en pourcentages
-    rate_columns = ["Taux d'Engagement", "Taux d'Attraction", 'Taux de Visite Profil', 
-                   'Taux de Follow', 'Taux de Clic Externe', '% Non-Followers']
-    for col in rate_columns:
-        export_df[col] = export_df[col].multiply(100).round(2)
-    
-    # Création du fichier CSV
-    csv = export_df.to_csv(index=False, encoding='utf-8-sig', sep=';')
-    
-    # Bouton de téléchargement
+    render_export(df)
+
+
+@st.fragment
+def render_export(frame):
+    """Choix du format et des colonnes, et bouton de téléchargement de l'export"""
+    export_format = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+    labels = export_labels(frame)
+    with st.expander("Colonnes exportées"):
+        columns = st.multiselect("Colonnes exportées", labels, default=labels, key="export_columns",
+                                 label_visibility="collapsed")
+    if not columns:
+        st.info("Sélectionnez au moins une colonne à exporter")
+        return
+    if export_format == "Excel" and len(frame) > EXCEL_MAX_ROWS:
+        st.warning(f"Excel est limité à {EXCEL_MAX_ROWS:,} lignes : choisissez CSV ou Parquet "
+                   f"pour exporter les {len(frame):,} posts")
+        return
+
+    # Bouton de téléchargement : le fichier (colonnes renommées, taux en pourcentages)
+    # n'est écrit qu'au clic, bloc par bloc dans un fichier temporaire, dans un thread
+    # séparé et sans réexécution du script ; partial fige les posts de cette exécution
+    extension, mime, _ = EXPORT_FORMATS[export_format]
     st.download_button(
-        "📥 Télécharger toutes les données (CSV)",
-        csv,
-        "moe_instagram_analytics.csv",
-        "text/csv",
-        help="Télécharger toutes les données avec les métriques calculées au format CSV"
-    ) 
+        f"📥 Télécharger toutes les données ({export_format})",
+        partial(write_export, frame, export_format, tuple(columns)),
+        f"moe_instagram_analytics.{extension}",
+        mime,
+        help=f"Télécharger toutes les données avec les métriques calculées au format {export_format}",
+        on_click="ignore"
+    )
+
+
+# Affichage de la section choisie
+SECTION_RENDERERS = {
+    "Overview": render_overview,
+    "Reels": render_reels,
+    "Photos": render_photos,
+    "Carrousel": render_carousel,
+    "Charts": render_charts,
+    "Explorer": render_explorer
+}
+with stage(f"onglet {section}"):
+    SECTION_RENDERERS[section]()
+
+# Panneau de profilage (administrateurs uniquement) : étapes de cette exécution,
+# également ajoutées au journal JSON lines
+if is_admin:
+    profiler = stop_profiling()
+    with st.sidebar:
+        st.markdown("---")
+        st.subheader("Profilage")
+        st.checkbox(
+            "Profiler les exécutions",
+            key="profiling",
+            help="Durée et pic mémoire de chaque étape, à partir de la prochaine exécution"
+        )
+        if profiler is not None:
+            session_id = st.session_state.setdefault('profiling_session', uuid.uuid4().hex[:8])
+            append_log(profiler.to_json(session=session_id, account=account, engine=engine, posts=len(df)))
+            
+            st.caption(f"Exécution : {profiler.total_seconds() * 1000:,.0f} ms — journal : {PROFILE_LOG_PATH}")
+            st.dataframe(
+                pd.DataFrame({
+                    "Étape": ["\u2003" * record['depth'] + record['stage'] for record in profiler.records],
+                    "Durée (ms)": [record['seconds'] * 1000 for record in profiler.records],
+                    "Pic mémoire (Mo)": [record['peak_bytes'] / 1024 ** 2 for record in profiler.records]
+                }),
+                column_config={
+                    "Durée (ms)": st.column_config.NumberColumn(format="%.1f"),
+                    "Pic mémoire (Mo)": st.column_config.NumberColumn(format="%.1f")
+                },
+                hide_index=True,
+                use_container_width=True
+            )
@@ -0,0 +1,60 @@
+"""Benchmark : conversion des durées de Reels, apply par ligne vs version vectorisée
+
+Usage : python benchmarks/bench_duree.py [nombre_de_posts ...]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_loader import parse_duree  # noqa: E402
+
+# Durées rencontrées dans les exports, y compris les cas invalides
+DUREE_SAMPLES = ['00.20', '00:31', '01:50', '1.5', ' 2 : 05', '3', '0.75', '-1.30',
+                 '1.', ':30', '1:30.5', '1:2:3', 'abc', '', None]
+
+
+def convert_to_seconds(duree):
+    """Ancienne implémentation de l'onglet Reels, appliquée ligne par ligne"""
+    if pd.isna(duree):
+        return None
+    try:
+        if '.' in str(duree):
+            minutes, seconds = map(float, str(duree).split('.'))
+            return minutes * 60 + seconds
+        elif ':' in str(duree):
+            minutes, seconds = map(float, str(duree).split(':'))
+            return minutes * 60 + seconds
+        return float(duree) * 60  # Si c'est juste un nombre, on considère que ce sont des minutes
+    except:
+        return None
+
+
+def make_durees(n, seed=0):
+    """Générer n durées aux formats mixtes"""
+    rng = np.random.default_rng(seed)
+    return pd.Series(rng.choice(np.array(DUREE_SAMPLES, dtype=object), n), dtype=object)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(sizes):
+    for n in sizes:
+        durees = make_durees(n)
+        expected, t_apply = timed(lambda: durees.apply(convert_to_seconds).astype('float64'))
+        result, t_vec = timed(parse_duree, durees)
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+        print(f"{n:>9} posts | apply {t_apply:8.3f} s | vectorisé {t_vec:8.4f} s "
+              f"| x{t_apply / t_vec:,.0f}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 1_000_000])
@@ -0,0 +1,297 @@
+"""Benchmark : chaque étape du pipeline sur des exports Instagram synthétiques
+
+Génère des CSV au format exact de insta_data.csv (séparateur ';', virgules
+décimales, formats d'heure et de durée mixtes) puis mesure le chargement, la
+conversion numérique, le timestamp, les filtres, les agrégations de chaque
+onglet, la heatmap, l'export et, avec --sql, le moteur SQL. Le rapport JSON
+permet de suivre les régressions d'une exécution à l'autre (--baseline).
+
+Usage : python benchmarks/bench_pipeline.py [nombre_de_posts ...]
+            [--output rapport.json] [--baseline ancien_rapport.json] [--repeat N] [--sql]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aggregations import (TIME_SERIES_METRICS, build_rollup, rollup_time_series,  # noqa: E402
+                          segment_stats)
+from data_loader import (COLUMN_MAPPING, HEURE_BIN_LABELS, NUMERIC_COLUMNS, _coerce_numeric,  # noqa: E402
+                         _prepare_posts, _read_posts_csv, _rollup_metrics, _write_snapshot,
+                         build_timestamp, file_fingerprint, load_posts, parse_duree,
+                         parse_heure, read_snapshot)
+from exports import EXPORT_FORMATS, write_export  # noqa: E402
+from filters import FilterIndex, Selection, TypeViews  # noqa: E402
+from sql_backend import SQL_ENGINE, SqlBackend  # noqa: E402
+
+# En-tête de l'export Instagram (avec ses fautes de frappe)
+CSV_COLUMNS = list(COLUMN_MAPPING)
+
+TYPES = ['Photo', 'Reels', 'Carrousel']
+PERIODES = ['Avant Trail', 'Pendant Trail', 'Après Trail']
+CONTENUS = ['Présentation', 'Lieux', 'Trail', 'Entrainement', 'Information', 'Trailer',
+            'Partenariat', 'Jeu Concours', 'Info Parcour', 'Fact', 'Rappel', 'Reco', 'Lancement']
+
+# Heures et durées aux formats rencontrés dans les exports, dont quelques cas invalides
+HEURE_SAMPLES = ['18', '6.0', '21.7', '24:00', '12:75', 'abc', ' 9:05', '10:00:00']
+DUREE_SAMPLES = ['1.5', '3', '0.75', ' 2 : 05', '1.', 'abc']
+
+# Segments et métriques analysés par chaque onglet (comme dans app.py)
+TYPE_TAB_SEGMENTS = ['contenu', 'periode', 'hashtags']
+TYPE_TAB_KPIS = ['vues', 'taux_engagement', 'taux_attraction', 'pct_non_followers']
+CHARTS_SEGMENTS = ['type', 'contenu', 'periode', 'jour_semaine', 'heure_bin', 'collab', 'hashtags',
+                   ('type', 'contenu'), ('periode', 'type'), ('heure_bin', 'type')]
+CHARTS_METRICS = ['vues', 'likes', 'commentaires', 'partages', 'enregistrements',
+                  'taux_engagement', 'taux_attraction', 'pct_non_followers',
+                  'visites_profil', 'followers_plus', 'clics_externes']
+
+
+def _decimal(values, decimals=2):
+    """Nombres formatés avec une virgule décimale"""
+    return pd.Series(values).round(decimals).map(f'{{:.{decimals}f}}'.format).str.replace('.', ',')
+
+
+def _mixed(rng, valid, samples, share):
+    """Valeurs valides dont une part (share) est remplacée par des formats atypiques"""
+    odd = rng.random(len(valid)) < share
+    valid = valid.astype(object)
+    valid[odd] = rng.choice(np.array(samples, dtype=object), odd.sum())
+    return valid
+
+
+def make_posts_csv(path, n, seed=0):
+    """Écrire un export synthétique de n posts au format de insta_data.csv"""
+    rng = np.random.default_rng(seed)
+    post_type = rng.choice(TYPES, n, p=[0.5, 0.3, 0.2])
+    is_reels = post_type == 'Reels'
+
+    dates = (pd.Timestamp('2022-01-01') + pd.to_timedelta(rng.integers(0, 1000, n), unit='D'))
+    date = pd.Series(dates.strftime('%Y-%m-%d'), dtype=object).where(rng.random(n) > 0.01, '')
+
+    # Heure : "HH:MM" le plus souvent, souvent absente, parfois atypique
+    heure = pd.Series(rng.integers(6, 23, n)).map('{:02d}'.format) + ':' + \
+        pd.Series(rng.integers(0, 60, n)).map('{:02d}'.format)
+    heure = pd.Series(_mixed(rng, heure.to_numpy(), HEURE_SAMPLES, 0.05)).where(rng.random(n) > 0.25, '')
+
+    # Durée des Reels : "MM:SS" ou "MM.SS"
+    duree = pd.Series(rng.integers(0, 3, n)).map('{:02d}'.format) + \
+        pd.Series(rng.choice([':', '.'], n)) + pd.Series(rng.integers(0, 60, n)).map('{:02d}'.format)
+    duree = pd.Series(_mixed(rng, duree.to_numpy(), DUREE_SAMPLES, 0.03)).where(is_reels, '')
+
+    images = pd.Series(rng.integers(2, 20, n).astype(str)).where(post_type == 'Carrousel', '')
+
+    vues = rng.lognormal(7.5, 1.2, n).round()
+    followers_share = rng.uniform(0.05, 0.6, n)
+    likes = rng.binomial(vues.astype('int64'), 0.05)
+    commentaires = rng.binomial(vues.astype('int64'), 0.004)
+    partages = rng.binomial(vues.astype('int64'), 0.006)
+    enregistrements = rng.binomial(vues.astype('int64'), 0.003)
+    visites = rng.binomial(vues.astype('int64'), 0.03)
+    followers_plus = rng.binomial(visites, 0.1)
+    clics = rng.binomial(visites, 0.05)
+
+    # Vues : entiers ou "7800,00" selon l'export
+    vues_text = pd.Series(vues.astype('int64').astype(str))
+    as_decimal = rng.random(n) < 0.3
+    vues_text[as_decimal] = _decimal(vues[as_decimal]).to_numpy()
+
+    raw = pd.DataFrame({
+        'Date': date,
+        'Heure': heure,
+        'Periode': rng.choice(PERIODES, n, p=[0.85, 0.12, 0.03]),
+        'Lien': [f'https://www.instagram.com/p/{i:011x}/' for i in range(n)],
+        'Titre': pd.Series(rng.integers(0, max(n // 4, 1), n)).map('Post {}'.format),
+        'Type': post_type,
+        'Durée (Reels)': duree,
+        'Nb Image (Carrousel)': images,
+        'Contenue': rng.choice(CONTENUS, n),
+        'Collaboration': np.where(rng.random(n) < 0.1, 'Oui', 'Non'),
+        'Vues': vues_text,
+        'Vues Followers': _decimal(vues * followers_share),
+        'Vues Non Followers': _decimal(vues * (1 - followers_share)),
+        'Nb Interaction': _decimal(likes + commentaires + partages + enregistrements),
+        'Likes': likes,
+        'Commentaires': commentaires,
+        'Partage': partages,
+        'Enregistrement': enregistrements,
+        'Activté du Profil': visites + followers_plus + clics,
+        'Visites du profil': visites,
+        'Followers en plus': followers_plus,
+        'Appuis sur des liens externes': clics,
+        'Hashtags': pd.Series(rng.integers(0, 4, n).astype(str)).where(rng.random(n) > 0.01, ''),
+    }, columns=CSV_COLUMNS)
+    raw.to_csv(path, sep=';', index=False, encoding='utf-8-sig')
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def read_text_csv(path):
+    """CSV brut lu entièrement en texte"""
+    return pd.read_csv(path, sep=';', dtype=str)
+
+
+def coerce_numeric(text):
+    """Conversion des colonnes numériques seule, sur des lignes lues en texte
+
+    read_csv convertit déjà les virgules décimales : _coerce_numeric ne traite
+    que les colonnes contenant une valeur illisible. Mesurée ici sur toutes les
+    colonnes lues en texte, cas le plus coûteux.
+    """
+    df = text.rename(columns=COLUMN_MAPPING)
+    parse_errors = []
+    for col in NUMERIC_COLUMNS + ['hashtags']:
+        _coerce_numeric(df, col, parse_errors)
+    return df
+
+
+def timestamp(raw):
+    """Construction du timestamp seule (analyse de l'heure comprise)"""
+    date = pd.to_datetime(raw['Date'], format='%Y-%m-%d', errors='coerce')
+    return build_timestamp(date, *parse_heure(raw['Heure']))
+
+
+def filter_posts(filter_index, rollup_index):
+    """Filtres de la barre latérale : plage de dates, période, hashtags, heure"""
+    dates = filter_index.df['date'].dropna()
+    selection = Selection(filter_index)
+    selection.restrict_dates(dates.quantile(0.1).date(), dates.quantile(0.9).date())
+    selection.restrict('periode', ['Avant Trail'])
+    selection.restrict('hashtags', [n for n in filter_index.values('hashtags') if 1 <= n <= 3])
+    selection.restrict('heure_bin', HEURE_BIN_LABELS[1:5])
+    df = filter_index.select(selection.bits)
+    type_views = TypeViews(filter_index, selection.bits)
+    frames = {post_type: type_views[post_type] for post_type in TYPES}
+    return selection, df, frames, selection.bits_for(rollup_index)
+
+
+def time_series(rollup_index, rollup_mask):
+    """Blocs « Évolution temporelle » : vue d'ensemble et onglets par type"""
+    metric_cols = list(TIME_SERIES_METRICS.values())
+    for post_type in [None] + TYPES:
+        bits = rollup_mask if post_type is None else rollup_mask & rollup_index.mask('type', [post_type])
+        cube = rollup_index.select(bits)
+        for resolution in ['Jour', 'Semaine', 'Mois']:
+            for aggregation in ['Somme', 'Moyenne']:
+                rollup_time_series(cube, metric_cols, resolution, aggregation)
+
+
+def heatmap(df):
+    """Heatmap jour × heure de la vue d'ensemble"""
+    return pd.pivot_table(df, values='vues', index='jour_semaine', columns='hour',
+                          aggfunc='median', fill_value=0, observed=True)
+
+
+def sql_queries(sql):
+    """Mêmes agrégations exécutées par le moteur SQL"""
+    for post_type in [None] + TYPES:
+        for resolution in ['Jour', 'Semaine', 'Mois']:
+            sql.time_series(post_type, list(TIME_SERIES_METRICS.values()), resolution, 'Somme')
+    for post_type in TYPES:
+        sql.segment_stats(post_type, TYPE_TAB_SEGMENTS, TYPE_TAB_KPIS)
+    sql.segment_stats(None, CHARTS_SEGMENTS, CHARTS_METRICS)
+    sql.heatmap('vues')
+
+
+def run(path, repeat, sql=False):
+    """Durée (meilleure de repeat exécutions, secondes) de chaque étape du pipeline"""
+    stages = {}
+
+    def stage(name, func, *args):
+        result, best = timed(func, *args)
+        for _ in range(repeat - 1):
+            best = min(best, timed(func, *args)[1])
+        stages[name] = best
+        return result
+
+    raw = stage('read_csv', _read_posts_csv, path)
+    stage('numeric_coercion', coerce_numeric, read_text_csv(path))
+    stage('timestamp', timestamp, raw)
+    stage('duree', parse_duree, raw['Durée (Reels)'])
+    stage('prepare', _prepare_posts, raw)
+    df = stage('load_posts', load_posts, path)
+    stage('snapshot_write', _write_snapshot, df, path)
+    stage('snapshot_read', read_snapshot, file_fingerprint(path))
+    rollup = stage('rollup', build_rollup, df, _rollup_metrics(df))
+    filter_index, rollup_index = stage('filter_index', lambda: (FilterIndex(df), FilterIndex(rollup)))
+
+    selection, selected, frames, rollup_mask = stage('filters', filter_posts, filter_index, rollup_index)
+    stage('time_series', time_series, rollup_index, rollup_mask)
+    for post_type, tab in zip(TYPES, ['photos', 'reels', 'carousel']):
+        stage(f'tab_{tab}', segment_stats, frames[post_type], TYPE_TAB_SEGMENTS, TYPE_TAB_KPIS)
+    stage('tab_charts', segment_stats, selected, CHARTS_SEGMENTS, CHARTS_METRICS)
+    stage('heatmap', heatmap, selected)
+    stage('export', lambda: write_export(selected, 'CSV').close())
+    if 'Parquet' in EXPORT_FORMATS:
+        stage('export_parquet', lambda: write_export(selected, 'Parquet').close())
+
+    if sql:
+        backend = stage('sql_build', SqlBackend, df)
+        stage('sql_queries', sql_queries, backend.bind(selection))
+        backend.close()
+    return stages
+
+
+def compare(report, baseline):
+    """Afficher chaque durée rapportée à celle d'un rapport précédent"""
+    for size, result in report['results'].items():
+        previous = baseline.get('results', {}).get(size, {}).get('stages', {})
+        for name, seconds in result['stages'].items():
+            if previous.get(name):
+                print(f"{size:>9} posts | {name:<18} {seconds:9.4f} s | x{seconds / previous[name]:.2f}")
+
+
+def main(sizes, output, baseline=None, repeat=1, sql=False):
+    report = {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'sql_engine': SQL_ENGINE if sql else None,
+        'repeat': repeat,
+        'results': {}
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f'posts_{n}.csv')
+            _, t_gen = timed(make_posts_csv, path, n)
+            stages = run(path, repeat, sql)
+            report['results'][str(n)] = {
+                'csv_bytes': os.path.getsize(path),
+                'generation': t_gen,
+                'stages': stages
+            }
+            print(f"{n:>9} posts | " + ' | '.join(f"{name} {seconds:.4f} s" for name, seconds in stages.items()))
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Rapport : {output}")
+
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--output', default='bench_pipeline.json')
+    parser.add_argument('--baseline')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--sql', action='store_true', help='mesurer aussi le moteur SQL')
+    args = parser.parse_args()
+    main(args.sizes, args.output, args.baseline, args.repeat, args.sql)
@@ -0,0 +1,94 @@
+"""Benchmark : construction du timestamp, boucle par ligne vs version vectorisée
+
+Usage : python benchmarks/bench_timestamp.py [nombre_de_posts ...]
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_loader import build_timestamp, get_heure_bin, parse_heure  # noqa: E402
+
+# Valeurs d'heure rencontrées dans les exports, y compris les cas invalides
+HEURE_SAMPLES = ['20:00', '07:30', ' 9:05', '23:59', '24:00', '12:75', '18', '6.0',
+                 '21.7', '-1', 'abc', '10:00:00', '', None]
+
+
+def legacy_timestamp(df):
+    """Ancienne implémentation : boucle Python avec df.loc par ligne"""
+    df = df.copy()
+    df['timestamp'] = df['date'].copy()
+    mask_heure = df['heure'].notna()
+
+    for idx in df[mask_heure].index:
+        try:
+            heure = str(df.loc[idx, 'heure'])
+            if ':' in heure:
+                h, m = map(int, heure.split(':'))
+            else:
+                h = int(float(heure))
+                m = 0
+            if pd.notna(df.loc[idx, 'date']):
+                df.loc[idx, 'timestamp'] = df.loc[idx, 'date'].replace(hour=h, minute=m)
+        except:
+            continue
+    return df['timestamp']
+
+
+def legacy_hour(heure):
+    """Ancienne extraction de l'heure (heatmap et périodes de la journée) : partie avant ':'"""
+    try:
+        if ':' in str(heure):
+            return int(float(str(heure).split(':')[0]))
+        return int(float(heure))
+    except (TypeError, ValueError):
+        return None
+
+
+def make_posts(n, seed=0):
+    """Générer n posts avec des dates et des heures mixtes"""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2022-01-01') + pd.to_timedelta(rng.integers(0, 1000, n), unit='D')
+    date = pd.Series(dates).where(rng.random(n) > 0.01)
+    heure = pd.Series(rng.choice(np.array(HEURE_SAMPLES, dtype=object), n), dtype=object)
+    return pd.DataFrame({'date': date, 'heure': heure})
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(sizes):
+    for n in sizes:
+        df = make_posts(n)
+        expected, t_loop = timed(legacy_timestamp, df)
+        result, t_vec = timed(lambda: build_timestamp(df['date'], *parse_heure(df['heure'])))
+
+        # "HH:MM:SS" : l'ancienne boucle laissait le timestamp à minuit ; le
+        # timestamp attendu est le sien sur l'heure privée de ses secondes
+        with_seconds = df['heure'].str.count(':').eq(2).fillna(False).astype(bool)
+        stripped = df.assign(heure=df['heure'].str.replace(r':[^:]*$', '', regex=True))
+        expected = expected.where(~with_seconds, legacy_timestamp(stripped[with_seconds]))
+        pd.testing.assert_series_equal(result, expected, check_names=False, check_dtype=False)
+
+        # Heure et période de la journée : comme l'ancienne extraction (heures hors
+        # 0-23 désormais manquantes)
+        hours, _ = parse_heure(df['heure'])
+        expected_hours = pd.to_numeric(df['heure'].map(legacy_hour), errors='coerce')
+        expected_hours = expected_hours.where(expected_hours.between(0, 23))
+        valid_hours = hours.where(hours.between(0, 23))
+        pd.testing.assert_series_equal(valid_hours, expected_hours, check_names=False, check_dtype=False)
+        pd.testing.assert_series_equal(get_heure_bin(valid_hours), get_heure_bin(expected_hours),
+                                       check_names=False)
+        print(f"{n:>9} posts | boucle {t_loop:8.3f} s | vectorisé {t_vec:8.4f} s "
+              f"| x{t_loop / t_vec:,.0f}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 50_000])
@@ -0,0 +1,596 @@
+"""Chargement et préparation des données Instagram MOE"""
+import glob
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from aggregations import append_rollup, build_rollup
+from profiling import profiled, stage
+
+# pyarrow figure dans requirements.txt ; sans lui, pas d'instantané et relecture du CSV
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+# Mapping des colonnes FR vers snake_case
+COLUMN_MAPPING = {
+    'Date': 'date',
+    'Heure': 'heure',
+    'Periode': 'periode',
+    'Lien': 'lien',
+    'Titre': 'titre',
+    'Type': 'type',
+    'Durée (Reels)': 'duree_reels',
+    'Nb Image (Carrousel)': 'nb_images_carousel',
+    'Contenue': 'contenu',
+    'Collaboration': 'collab',
+    'Vues': 'vues',
+    'Vues Followers': 'vues_followers',
+    'Vues Non Followers': 'vues_non_followers',
+    'Nb Interaction': 'nb_interactions',
+    'Likes': 'likes',
+    'Commentaires': 'commentaires',
+    'Partage': 'partages',
+    'Enregistrement': 'enregistrements',
+    'Activté du Profil': 'activite_profil',
+    'Visites du profil': 'visites_profil',
+    'Followers en plus': 'followers_plus',
+    'Appuis sur des liens externes': 'clics_externes',
+    'Hashtags': 'hashtags'
+}
+
+# Mapping des jours de la semaine en français
+JOURS_SEMAINE = {
+    0: 'Lun',
+    1: 'Mar',
+    2: 'Mer',
+    3: 'Jeu',
+    4: 'Ven',
+    5: 'Sam',
+    6: 'Dim'
+}
+
+# Colonnes de texte du CSV
+TEXT_COLUMNS = ['Heure', 'Periode', 'Lien', 'Titre', 'Type', 'Durée (Reels)', 'Contenue', 'Collaboration']
+
+# Colonnes numériques (les hashtags sont traités à part)
+NUMERIC_COLUMNS = ['vues', 'vues_followers', 'vues_non_followers', 'nb_interactions',
+                   'likes', 'commentaires', 'partages', 'enregistrements',
+                   'activite_profil', 'visites_profil', 'followers_plus',
+                   'clics_externes']
+
+
+# Nombre maximal de valeurs illisibles détaillées dans le rapport de chargement
+# (df.attrs est recopié à chaque opération pandas, il doit rester léger)
+PARSE_ERROR_LIMIT = 100
+
+# Instantané Arrow des données enrichies, écrit à côté du CSV
+SNAPSHOT_SUFFIX = '.snapshot.arrow'
+
+# Au-delà de cette taille (octets), le CSV est lu par blocs de CHUNK_SIZE lignes :
+# le texte brut du fichier n'est jamais chargé en entier
+CHUNKED_INGEST_THRESHOLD = 256 * 1024 ** 2
+CHUNK_SIZE = 200_000
+
+# Schéma compact appliqué en fin de chargement
+CATEGORY_COLUMNS = ['type', 'contenu', 'periode', 'titre', 'heure', 'duree_reels']
+COUNT_COLUMNS = ['vues', 'vues_followers', 'vues_non_followers', 'nb_interactions',
+                 'likes', 'commentaires', 'partages', 'enregistrements',
+                 'activite_profil', 'visites_profil', 'followers_plus', 'clics_externes',
+                 'hashtags', 'nb_images_carousel', 'nb_interactions_calc', 'activite_profil_calc']
+FLOAT32_COLUMNS = ['duree_secondes', 'taux_engagement', 'taux_attraction', 'profile_visit_rate',
+                   'follow_rate', 'external_ctr', 'pct_non_followers']
+
+# Périodes de la journée : bornes (heure de fin incluse) et libellés
+HEURE_BIN_EDGES = [-1, 5, 9, 13, 17, 21, 23]
+HEURE_BIN_LABELS = ['Nuit', 'Matin', 'Midi', 'Après-midi', 'Soir', 'Tard']
+
+# Format "HH:MM" ou "HH:MM:SS" (CSV réenregistré par Excel) ; entiers, espaces
+# tolérés autour de chaque partie, secondes ignorées
+HEURE_HHMM_PATTERN = r'^\s*([+-]?\d+)\s*:\s*([+-]?\d+)(?:\s*:\s*\d+)?\s*$'
+
+# Durée des Reels "M.SS" ou "M:SS" (un seul séparateur)
+DUREE_PATTERN = r'^\s*([+-]?\d+)\s*[.:]\s*([+-]?\d+)\s*$'
+
+
+def _parse_distinct(values, parser):
+    """Appliquer un parseur vectorisé aux seules valeurs distinctes d'une colonne
+
+    Heures et durées ne prennent que quelques centaines de valeurs : le texte
+    n'est analysé qu'une fois par valeur, puis le résultat est rediffusé par code.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    parsed = parser(pd.Series(uniques, dtype=object)).take(codes)
+    parsed.index = values.index
+    return parsed
+
+
+def _parse_heure_values(heure):
+    heure = heure.astype('string')
+    has_colon = heure.str.contains(':', regex=False).fillna(False).astype(bool)
+
+    # Format "HH:MM" ou "HH:MM:SS"
+    hhmm = heure.str.extract(HEURE_HHMM_PATTERN)
+    hours_hhmm = pd.to_numeric(hhmm[0], errors='coerce').astype('float64')
+    minutes_hhmm = pd.to_numeric(hhmm[1], errors='coerce').astype('float64')
+
+    # Nombre seul : heure entière, partie décimale tronquée
+    hours_bare = np.trunc(pd.to_numeric(heure.where(~has_colon), errors='coerce').astype('float64'))
+
+    hours = hours_hhmm.where(has_colon, hours_bare)
+    minutes = minutes_hhmm.where(has_colon, 0.0).where(hours.notna())
+    return pd.DataFrame({'hours': hours, 'minutes': minutes})
+
+
+def parse_heure(heure):
+    """Extraire heures et minutes d'une colonne heure ("HH:MM", "HH:MM:SS" ou nombre seul)
+
+    Retourne deux Series float64, NaN quand la valeur n'est pas interprétable.
+    """
+    parsed = _parse_distinct(heure, _parse_heure_values)
+    return parsed['hours'], parsed['minutes']
+
+
+def _parse_duree_values(duree):
+    duree = duree.astype('string')
+    has_separator = duree.str.contains(r'[.:]').fillna(False).astype(bool)
+
+    # Formats "M.SS" et "M:SS"
+    parts = duree.str.extract(DUREE_PATTERN)
+    minutes = pd.to_numeric(parts[0], errors='coerce').astype('float64')
+    seconds = pd.to_numeric(parts[1], errors='coerce').astype('float64')
+
+    # Nombre seul : minutes
+    bare_minutes = pd.to_numeric(duree.where(~has_separator), errors='coerce').astype('float64')
+
+    return (minutes * 60 + seconds).where(has_separator, bare_minutes * 60)
+
+
+def parse_duree(duree):
+    """Convertir les durées de Reels en secondes
+
+    Accepte "M.SS" et "M:SS" (minutes et secondes) ou un nombre seul, lu comme
+    un nombre de minutes. NaN quand la valeur n'est pas interprétable.
+    """
+    return _parse_distinct(duree, _parse_duree_values)
+
+
+def get_heure_bin(hours):
+    """Associer chaque heure (0-23) à sa période de la journée"""
+    return pd.cut(hours, bins=HEURE_BIN_EDGES, labels=HEURE_BIN_LABELS)
+
+
+def build_timestamp(date, hours, minutes):
+    """Combiner date et heure en timestamp, sans boucle Python par ligne
+
+    Les heures absentes ou invalides laissent le timestamp à minuit.
+    """
+    valid = date.notna() & hours.between(0, 23) & minutes.between(0, 59)
+    offset = (hours * 60 + minutes).where(valid, 0)
+    return date + pd.to_timedelta(offset, unit='min')
+
+
+def apply_schema(df):
+    """Convertir les colonnes en types compacts : catégories, Int32 nullables, float32 pour les taux"""
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    # Jours dans l'ordre de la semaine (heure_bin est déjà catégorielle)
+    df['jour_semaine'] = pd.Categorical(df['jour_semaine'],
+                                        categories=list(JOURS_SEMAINE.values()),
+                                        ordered=True)
+
+    for col in COUNT_COLUMNS:
+        if col in df.columns:
+            # Compteurs décimaux (vues réparties au prorata...) gardés en float64 :
+            # en float32, leurs totaux perdent des unités
+            is_integer = (df[col].dropna() % 1 == 0).all()
+            df[col] = df[col].astype('Int32' if is_integer else 'float64')
+
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('float32')
+
+    return df
+
+
+@lru_cache(maxsize=32)
+def _content_hash(path, mtime_ns, size):
+    """Hash du contenu, recalculé uniquement quand mtime ou taille changent"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """Empreinte d'un fichier : chemin absolu, mtime, taille et hash du contenu"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size,
+            _content_hash(path, stat.st_mtime_ns, stat.st_size))
+
+
+@lru_cache(maxsize=1)
+def _pipeline_version():
+    """Hash de ce module : toute modification du traitement invalide les instantanés"""
+    with open(__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def snapshot_path(path, content_hash):
+    """Chemin de l'instantané pour une version du CSV et du traitement"""
+    return f"{path}.{content_hash[:16]}-{_pipeline_version()}{SNAPSHOT_SUFFIX}"
+
+
+def _write_snapshot(df, path):
+    """Écrire l'instantané (écriture atomique) et supprimer les versions obsolètes
+
+    L'instantané est nommé d'après le hash du contenu effectivement lu, enregistré
+    dans df.attrs['ingest'] : le fichier a pu changer depuis le calcul de l'empreinte.
+    """
+    if feather is None:
+        return
+    target = snapshot_path(path, df.attrs['ingest']['sha256'])
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    try:
+        feather.write_feather(df, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, target)
+        for old in glob.glob(f"{glob.escape(path)}.*{SNAPSHOT_SUFFIX}"):
+            if old != target:
+                os.remove(old)
+    except OSError:
+        # Dossier en lecture seule : l'instantané n'est qu'une optimisation
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@profiled('instantané')
+def read_snapshot(fingerprint):
+    """Posts de l'instantané Arrow de cette version du CSV, None s'il n'existe pas
+
+    L'instantané est nommé d'après le hash du contenu du CSV : un CSV modifié
+    n'a pas d'instantané et doit être relu.
+    """
+    if feather is None:
+        return None
+    target = snapshot_path(fingerprint[0], fingerprint[3])
+    if os.path.exists(target):
+        try:
+            return feather.read_feather(target, memory_map=True)
+        except Exception:
+            pass  # Instantané illisible : reconstruit à partir du CSV
+    return None
+
+
+def _coerce_numeric(df, col, parse_errors):
+    """Convertir une colonne restée en texte et relever les valeurs illisibles"""
+    if pd.api.types.is_numeric_dtype(df[col]):
+        return
+    raw = df[col].astype('string').str.strip()
+    values = pd.to_numeric(raw.str.replace(',', '.', regex=False), errors='coerce')
+    failed = raw.fillna('').ne('') & values.isna()
+    # Numéro de ligne dans le fichier (ligne 1 = en-tête)
+    parse_errors.extend(
+        {'ligne': int(idx) + 2, 'colonne': col, 'valeur': str(value)}
+        for idx, value in raw[failed].items()
+    )
+    df[col] = values.astype('float64')
+
+
+def _read_posts_csv(source, chunksize=None):
+    """Lire le CSV brut des posts (chemin ou flux d'octets), par blocs si chunksize"""
+    # Virgule décimale française convertie dès la lecture ; colonnes de texte lues
+    # en texte, quel que soit le bloc ou les lignes ajoutées ("18", "2025" restent
+    # des chaînes) et durée "00.20" qui ne doit pas devenir le flottant 0.2
+    return pd.read_csv(source, sep=';', decimal=',', dtype=dict.fromkeys(TEXT_COLUMNS, str),
+                       chunksize=chunksize)
+
+
+def _ingest_state(offset, rows, digest):
+    """État d'ingestion : octets et lignes de données traités, hash de ces octets"""
+    return {'offset': offset, 'rows': rows, 'sha256': digest.hexdigest()}
+
+
+class _HashingReader(io.RawIOBase):
+    """Flux de lecture d'un fichier qui hache et compte les octets au passage"""
+
+    def __init__(self, f):
+        self._f = f
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._f.readinto(buffer)
+        if n:
+            self.digest.update(memoryview(buffer)[:n])
+            self.size += n
+        return n
+
+
+def _concat_posts(frames):
+    """Concaténer des frames enrichis en conservant les colonnes catégorielles
+
+    Les catégories sont réunies et triées comme le fait apply_schema sur le frame
+    entier ; sans cela pandas repasse les colonnes en texte.
+    """
+    for col in CATEGORY_COLUMNS:
+        if all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames if col in frame):
+            categories = [frame[col].cat.categories for frame in frames if col in frame]
+            if len(categories) > 1:
+                union = categories[0].append(categories[1:]).unique().sort_values()
+                frames = [frame.assign(**{col: frame[col].cat.set_categories(union)})
+                          if col in frame else frame for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_posts(path):
+    """Lire le CSV des posts et calculer toutes les colonnes dérivées
+
+    Les valeurs numériques illisibles sont relevées dans df.attrs['parse_errors']
+    (au plus PARSE_ERROR_LIMIT lignes) et leur nombre dans df.attrs['parse_error_count'].
+    La portion du fichier traitée est décrite par df.attrs['ingest'] (voir append_posts).
+    """
+    with stage('lecture CSV'):
+        with open(path, 'rb') as f:
+            content = f.read()
+        raw = _read_posts_csv(io.BytesIO(content))
+    df, parse_errors = _prepare_posts(raw)
+    df.attrs['parse_errors'] = parse_errors[:PARSE_ERROR_LIMIT]
+    df.attrs['parse_error_count'] = len(parse_errors)
+    df.attrs['ingest'] = _ingest_state(len(content), len(raw), hashlib.sha256(content))
+    return df
+
+
+def load_posts_chunked(path, chunksize=CHUNK_SIZE):
+    """Lire un gros CSV par blocs, sans jamais charger son texte brut en entier
+
+    Chaque bloc est renommé, converti et enrichi comme par load_posts, ajouté au
+    cube journalier puis écrit dans un stockage en colonnes temporaire sur disque
+    (fichiers Arrow). Le frame final est assemblé à partir de ce stockage ; il
+    est identique à celui de load_posts. Retourne un LoadedPosts.
+    """
+    parse_errors, parse_error_count, rows = [], 0, 0
+    rollup, parts = None, []
+    with tempfile.TemporaryDirectory(prefix='moe-ingest-', ignore_cleanup_errors=True) as store:
+        with open(path, 'rb') as f:
+            reader = _HashingReader(f)
+            # L'index des blocs se poursuit d'un bloc à l'autre : numéros de ligne exacts
+            for i, raw in enumerate(_read_posts_csv(io.BufferedReader(reader), chunksize=chunksize)):
+                rows += len(raw)
+                chunk, errors = _prepare_posts(raw)
+                del raw
+                parse_error_count += len(errors)
+                parse_errors.extend(errors[:PARSE_ERROR_LIMIT - len(parse_errors)])
+
+                metrics = _rollup_metrics(chunk)
+                rollup = build_rollup(chunk, metrics) if rollup is None else append_rollup(rollup, chunk, metrics)
+
+                if feather is not None:
+                    part = os.path.join(store, f'part-{i:05d}.arrow')
+                    feather.write_feather(chunk, part, compression='uncompressed')
+                    parts.append(part)
+                else:
+                    parts.append(chunk)
+                del chunk
+
+        # Blocs triés chacun par date : le tri stable final reproduit l'ordre d'une lecture complète
+        frames = [feather.read_feather(part, memory_map=True) if isinstance(part, str) else part
+                  for part in parts]
+        df = _concat_posts(frames)
+        del frames, parts
+        df = df.sort_values('timestamp', kind='stable', na_position='last').reset_index(drop=True)
+    df = apply_schema(df)
+
+    df.attrs['parse_errors'] = parse_errors
+    df.attrs['parse_error_count'] = parse_error_count
+    df.attrs['ingest'] = _ingest_state(reader.size, rows, reader.digest)
+    return LoadedPosts(df, rollup)
+
+
+def append_posts(df, path):
+    """Compléter df avec les lignes ajoutées à la fin du CSV depuis sa lecture
+
+    Seule la fin du fichier est analysée. Retourne (frame complété, posts ajoutés),
+    ou None quand un rechargement complet est nécessaire : état d'ingestion absent,
+    fichier raccourci, début du fichier modifié ou dernière ligne prolongée.
+    """
+    state = df.attrs.get('ingest')
+    if not state:
+        return None
+
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(0)
+        # Partie déjà lue hachée par blocs, sans être conservée en mémoire
+        digest = hashlib.sha256()
+        prefix_size, last_byte = 0, b''
+        while prefix_size < state['offset']:
+            block = f.read(min(1024 * 1024, state['offset'] - prefix_size))
+            if not block:
+                break
+            digest.update(block)
+            prefix_size += len(block)
+            last_byte = block[-1:]
+        tail = f.read()
+    if prefix_size < state['offset'] or digest.hexdigest() != state['sha256']:
+        return None
+    if not tail:
+        return df, df.iloc[:0]
+    if last_byte != b'\n' and not tail.startswith((b'\n', b'\r')):
+        return None
+
+    # Les lignes ajoutées sont relues sous l'en-tête du fichier ; leur index
+    # reprend la numérotation des lignes de données pour le rapport d'erreurs
+    raw = _read_posts_csv(io.BytesIO(header + tail))
+    raw.index = pd.RangeIndex(state['rows'], state['rows'] + len(raw))
+    new_rows, parse_errors = _prepare_posts(raw)
+
+    # Tri stable : à date égale, les lignes existantes restent avant les nouvelles,
+    # comme lors d'une lecture complète du fichier
+    combined = _concat_posts([df, new_rows])
+    combined = combined.sort_values('timestamp', kind='stable', na_position='last').reset_index(drop=True)
+    combined = apply_schema(combined)
+
+    combined.attrs['parse_errors'] = (df.attrs['parse_errors'] + parse_errors)[:PARSE_ERROR_LIMIT]
+    combined.attrs['parse_error_count'] = df.attrs['parse_error_count'] + len(parse_errors)
+    digest = digest.copy()
+    digest.update(tail)
+    combined.attrs['ingest'] = _ingest_state(prefix_size + len(tail), state['rows'] + len(raw), digest)
+    return combined, new_rows
+
+
+def _prepare_posts(df):
+    """Nettoyer et enrichir des lignes brutes ; retourne (frame, valeurs illisibles)"""
+    # Suppression de la ligne d'en-tête si elle apparaît dans les données
+    df = df[~df['Date'].astype(str).str.contains('Date', na=False)]
+
+    # Renommage des colonnes
+    df = df.rename(columns=COLUMN_MAPPING)
+
+    with stage('conversion numérique'):
+        # Colonnes numériques : seules celles contenant une valeur illisible restent en texte
+        parse_errors = []
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns:
+                _coerce_numeric(df, col, parse_errors)
+
+        # Traitement spécial pour les hashtags (remplacement des valeurs manquantes par 0)
+        df['hashtags'] = df['hashtags'].fillna(0)
+        _coerce_numeric(df, 'hashtags', parse_errors)
+
+        # Nombre d'images : en texte si une ligne d'en-tête répétée figurait dans la colonne
+        if 'nb_images_carousel' in df.columns:
+            _coerce_numeric(df, 'nb_images_carousel', parse_errors)
+
+    with stage('dates et heures'):
+        # Traitement des dates et heures
+        df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d', errors='coerce')
+
+        # Heure de publication, analysée une seule fois pour toutes les colonnes dérivées
+        hours, minutes = parse_heure(df['heure'])
+        valid_hours = hours.where(hours.between(0, 23))
+        df['hour'] = valid_hours.astype('Int8')
+
+        # Création du timestamp
+        df['timestamp'] = build_timestamp(df['date'], hours, minutes)
+
+        # Colonnes temporelles dérivées
+        df['jour_semaine'] = df['date'].dt.dayofweek.map(JOURS_SEMAINE)
+        df['semaine'] = df['date'].dt.isocalendar().week
+        df['mois'] = df['date'].dt.month
+        df['heure_bin'] = get_heure_bin(valid_hours)
+
+    # Durée des Reels en secondes
+    df['duree_secondes'] = parse_duree(df['duree_reels'])
+
+    # Création des colonnes type spécifiques
+    df['is_reels'] = df['type'].fillna('').str.strip() == 'Reels'
+    df['is_photo'] = df['type'].fillna('').str.strip() == 'Photo'
+    df['is_carousel'] = df['type'].fillna('').str.strip() == 'Carrousel'
+
+    # Conversion de la colonne collaboration en booléen
+    df['collab'] = df['collab'].fillna('Non').str.strip() == 'Oui'
+
+    with stage('indicateurs'):
+        # Recalcul des KPIs manquants
+        # nb_interactions = likes + commentaires + enregistrements + partages
+        df['nb_interactions_calc'] = df['likes'].fillna(0) + df['commentaires'].fillna(0) + \
+                                       df['enregistrements'].fillna(0) + df['partages'].fillna(0)
+
+        # taux_engagement = nb_interactions / vues
+        df['taux_engagement'] = (df['nb_interactions'] / df['vues']).fillna(
+            df['nb_interactions_calc'] / df['vues'])
+
+        # activite_profil = visites_profil + followers_plus + clics_externes
+        df['activite_profil_calc'] = df['visites_profil'].fillna(0) + \
+                                      df['followers_plus'].fillna(0) + \
+                                      df['clics_externes'].fillna(0)
+
+        # taux_attraction = activite_profil / vues
+        df['taux_attraction'] = (df['activite_profil'] / df['vues']).fillna(
+            df['activite_profil_calc'] / df['vues'])
+
+        # Autres taux
+        df['profile_visit_rate'] = df['visites_profil'] / df['vues']
+        df['follow_rate'] = df['followers_plus'] / df['vues']
+        df['external_ctr'] = df['clics_externes'] / df['vues']
+        df['pct_non_followers'] = df['vues_non_followers'] / (df['vues_followers'] + df['vues_non_followers'])
+
+    # Tri chronologique : une plage de dates devient une tranche contiguë de lignes
+    df = df.sort_values('timestamp', kind='stable', na_position='last').reset_index(drop=True)
+
+    return apply_schema(df), parse_errors
+
+
+# Posts enrichis et cube journalier d'une même version du fichier
+LoadedPosts = namedtuple('LoadedPosts', ['df', 'rollup'])
+
+
+class IncrementalLoader:
+    """Dernière version chargée d'un CSV, complétée quand le fichier ne fait que grandir
+
+    Tant que le début du fichier est inchangé, seules les lignes ajoutées sont
+    analysées puis ajoutées au frame et au cube journalier ; sinon le fichier
+    est rechargé entièrement (depuis l'instantané Arrow quand il existe, par
+    blocs au-delà de CHUNKED_INGEST_THRESHOLD).
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.loaded = None
+        self._lock = threading.Lock()
+
+    def load(self, fingerprint):
+        """Posts et cube pour la version du fichier décrite par fingerprint"""
+        with self._lock:
+            loaded = None
+            if self.loaded is not None:
+                try:
+                    loaded = self._append()
+                except Exception:
+                    # Lignes ajoutées inexploitables seules : rechargement complet
+                    loaded = None
+            if loaded is None:
+                loaded = self._full_load(fingerprint)
+            self.loaded = loaded
+            return loaded
+
+    def _full_load(self, fingerprint):
+        df = read_snapshot(fingerprint)
+        if df is not None:
+            return LoadedPosts(df, build_rollup(df, _rollup_metrics(df)))
+        if os.path.getsize(self.path) > CHUNKED_INGEST_THRESHOLD:
+            loaded = load_posts_chunked(self.path)
+        else:
+            df = load_posts(self.path)
+            loaded = LoadedPosts(df, build_rollup(df, _rollup_metrics(df)))
+        _write_snapshot(loaded.df, self.path)
+        return loaded
+
+    def _append(self):
+        result = append_posts(self.loaded.df, self.path)
+        if result is None:
+            return None
+        df, new_rows = result
+        if new_rows.empty:
+            return self.loaded
+        _write_snapshot(df, self.path)
+        return LoadedPosts(df, append_rollup(self.loaded.rollup, new_rows, _rollup_metrics(df)))
+
+
+def _rollup_metrics(df):
+    return [col for col in NUMERIC_COLUMNS if col in df.columns]
@@ -0,0 +1,192 @@
+"""Versions des données servies aux sessions, reconstruites en arrière-plan"""
+import glob
+import os
+import threading
+import traceback
+from collections import OrderedDict, namedtuple
+
+from data_loader import IncrementalLoader, file_fingerprint
+from filters import FilterIndex
+from profiling import stage
+
+# Intervalle de scrutation du fichier (secondes)
+POLL_INTERVAL = 5.0
+
+# Mémoire totale allouée aux jeux de données chargés (octets)
+MEMORY_BUDGET = 1024 ** 3
+
+# Une version complète des données : posts enrichis, cube journalier, leurs index
+# et la mémoire occupée par l'ensemble (octets)
+Dataset = namedtuple('Dataset', ['fingerprint', 'df', 'filter_index', 'rollup_index', 'nbytes'])
+
+
+def _index_nbytes(filter_index):
+    frame = int(filter_index.df.memory_usage(index=True, deep=True).sum())
+    return frame + sum(bits.nbytes for masks in filter_index.masks.values() for bits in masks.values())
+
+
+def build_dataset(loader, fingerprint):
+    """Charger une version du fichier et construire toutes les structures dérivées"""
+    loaded = loader.load(fingerprint)
+    with stage('index des filtres'):
+        filter_index = FilterIndex(loaded.df)
+        rollup_index = FilterIndex(loaded.rollup)
+    return Dataset(fingerprint, loaded.df, filter_index, rollup_index,
+                   _index_nbytes(filter_index) + _index_nbytes(rollup_index))
+
+
+def discover_sources(data_dir, data_path=None, extra=None):
+    """Jeux de données disponibles, {nom du compte: chemin du CSV}
+
+    Un compte par CSV de data_dir (nommé d'après le fichier), plus data_path
+    s'il existe et les entrées de extra, qui priment en cas de doublon.
+    """
+    sources = {}
+    paths = ([data_path] if data_path and os.path.isfile(data_path) else []) + \
+        sorted(glob.glob(os.path.join(glob.escape(data_dir), '*.csv')))
+    for path in paths:
+        sources.setdefault(os.path.splitext(os.path.basename(path))[0], path)
+    sources.update(extra or {})
+    return sources
+
+
+class DataWatcher:
+    """Surveille un fichier de données et reconstruit sa version courante hors requête
+
+    Un thread scrute mtime et taille du fichier ; à chaque changement de contenu,
+    la nouvelle version est entièrement construite puis substituée d'un bloc à
+    self.current. Une session lit self.current une fois par exécution du script
+    et n'attend donc jamais un rechargement (sauf le tout premier chargement).
+    """
+
+    def __init__(self, path, interval=POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.interval = interval
+        self.loader = IncrementalLoader(self.path)
+        self.last_error = None
+        self._stat = self._stat_key()
+        self.current = build_dataset(self.loader, file_fingerprint(self.path))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f"DataWatcher({os.path.basename(self.path)})")
+        self._thread.start()
+
+    def _stat_key(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                # Fichier absent ou en cours d'écriture : la version courante reste servie
+                self.last_error = traceback.format_exc()
+
+    def check(self):
+        """Reconstruire la version courante si le fichier a changé ; True si substituée"""
+        stat = self._stat_key()
+        if stat == self._stat:
+            return False
+        fingerprint = file_fingerprint(self.path)
+        if fingerprint[3] != self.current.fingerprint[3]:
+            self.current = build_dataset(self.loader, fingerprint)
+            changed = True
+        else:
+            changed = False  # Fichier touché mais contenu identique
+        # Retenu seulement après une construction réussie : sinon nouvel essai au prochain passage
+        self._stat = stat
+        self.last_error = None
+        return changed
+
+    def stop(self):
+        """Arrêter la surveillance"""
+        self._stop.set()
+
+
+class DatasetRegistry:
+    """Jeux de données par compte, chargés à la première sélection
+
+    Chaque jeu chargé a son propre DataWatcher. Au-delà de memory_budget, les
+    jeux les moins récemment sélectionnés sont libérés (le jeu demandé est
+    toujours conservé) ; les autres restent en mémoire d'un changement de compte
+    à l'autre.
+    """
+
+    def __init__(self, sources, memory_budget=MEMORY_BUDGET):
+        self.sources = dict(sources)
+        self.memory_budget = memory_budget
+        self._watchers = OrderedDict()
+        self._lock = threading.Lock()
+        # Un verrou par compte, pris pendant son premier chargement
+        self._loading = {}
+
+    def update_sources(self, sources):
+        """Remplacer les comptes disponibles
+
+        Les jeux chargés des comptes retirés, ou dont le fichier a changé de
+        chemin, sont libérés ; les autres restent en mémoire.
+        """
+        sources = dict(sources)
+        with self._lock:
+            for name in list(self._watchers):
+                if sources.get(name) != self.sources.get(name):
+                    self._watchers.pop(name).stop()
+            self.sources = sources
+
+    def names(self):
+        """Noms des comptes disponibles"""
+        return list(self.sources)
+
+    def is_loaded(self, name):
+        """Le jeu de données du compte est-il en mémoire ?"""
+        return name in self._watchers
+
+    def get(self, name):
+        """Version courante du jeu de données d'un compte, chargé si nécessaire"""
+        with self._lock:
+            watcher = self._watchers.get(name)
+            if watcher is not None:
+                self._watchers.move_to_end(name)
+                return watcher.current
+            loading = self._loading.setdefault(name, threading.Lock())
+            path = self.sources[name]
+
+        # Premier chargement hors du verrou global : les sessions des autres comptes
+        # ne l'attendent pas, celles du même compte attendent ce seul chargement
+        with loading:
+            with self._lock:
+                watcher = self._watchers.get(name)
+                if watcher is not None:
+                    self._watchers.move_to_end(name)
+                    return watcher.current
+            watcher = DataWatcher(path)
+            with self._lock:
+                if self.sources.get(name) != path:
+                    # Compte retiré pendant le chargement : servi pour cette exécution seulement
+                    watcher.stop()
+                    return watcher.current
+                self._watchers[name] = watcher
+                self._evict()
+                return watcher.current
+
+    def last_error(self, name):
+        """Erreur du dernier rechargement manqué du compte (traceback), ou None"""
+        watcher = self._watchers.get(name)
+        return watcher.last_error if watcher is not None else None
+
+    def memory_usage(self):
+        """Mémoire occupée par les jeux chargés (octets)"""
+        return sum(watcher.current.nbytes for watcher in self._watchers.values())
+
+    def _evict(self):
+        while len(self._watchers) > 1 and self.memory_usage() > self.memory_budget:
+            _, watcher = self._watchers.popitem(last=False)
+            watcher.stop()
+
+    def close(self):
+        """Arrêter la surveillance de tous les jeux chargés"""
+        with self._lock:
+            for watcher in self._watchers.values():
+                watcher.stop()
+            self._watchers.clear()
@@ -0,0 +1,182 @@
+"""Export des posts enrichis (onglet Explorateur) : CSV, Parquet ou Excel
+
+Les fichiers sont écrits bloc par bloc dans un fichier temporaire : la mise en
+forme n'occupe que la mémoire d'un bloc, sans copie complète des posts ni du texte
+exporté. Le fichier terminé est ensuite lu en entier par Streamlit, qui le garde
+en mémoire pour le téléchargement : le pic reste proportionnel à sa taille.
+"""
+import io
+import tempfile
+
+import pandas as pd
+
+# pyarrow et openpyxl figurent dans requirements.txt ; sans eux,
+# le format correspondant n'est pas proposé
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+# Libellés des colonnes dans le fichier exporté
+EXPORT_COLUMNS = {
+    'date': 'Date',
+    'heure': 'Heure',
+    'periode': 'Période',
+    'type': 'Type',
+    'titre': 'Titre',
+    'lien': 'Lien',
+    'contenu': 'Contenu',
+    'collab': 'Collaboration',
+    'duree_reels': 'Durée Reels',
+    'nb_images_carousel': 'Nombre Images Carrousel',
+    'vues': 'Vues',
+    'vues_followers': 'Vues Followers',
+    'vues_non_followers': 'Vues Non-Followers',
+    'nb_interactions': 'Interactions',
+    'likes': 'Likes',
+    'commentaires': 'Commentaires',
+    'partages': 'Partages',
+    'enregistrements': 'Enregistrements',
+    'activite_profil': 'Activité Profil',
+    'visites_profil': 'Visites Profil',
+    'followers_plus': 'Nouveaux Followers',
+    'clics_externes': 'Clics Externes',
+    'hashtags': 'Hashtags',
+    'jour_semaine': 'Jour de la Semaine',
+    'heure_bin': 'Période de la Journée',
+    'taux_engagement': "Taux d'Engagement",
+    'taux_attraction': "Taux d'Attraction",
+    'profile_visit_rate': 'Taux de Visite Profil',
+    'follow_rate': 'Taux de Follow',
+    'external_ctr': 'Taux de Clic Externe',
+    'pct_non_followers': '% Non-Followers'
+}
+
+# Taux exportés en pourcentages
+EXPORT_RATE_COLUMNS = ["Taux d'Engagement", "Taux d'Attraction", 'Taux de Visite Profil',
+                       'Taux de Follow', 'Taux de Clic Externe', '% Non-Followers']
+
+# Nombre de posts formatés et écrits à la fois
+EXPORT_CHUNK_ROWS = 50_000
+
+# Lignes de données d'une feuille Excel (en-tête non compris)
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def export_labels(df):
+    """Libellés des colonnes exportées, dans l'ordre du frame"""
+    return [EXPORT_COLUMNS.get(col, col) for col in df.columns]
+
+
+def export_frame(df):
+    """Posts prêts à l'export : colonnes renommées, dates en texte, taux en %"""
+    export_df = df.rename(columns=EXPORT_COLUMNS)
+
+    # Formatage des colonnes pour l'export
+    if 'Date' in export_df:
+        export_df['Date'] = export_df['Date'].dt.strftime('%Y-%m-%d')
+    if 'Collaboration' in export_df:
+        export_df['Collaboration'] = export_df['Collaboration'].map({True: 'Oui', False: 'Non'})
+
+    # Conversion des taux en pourcentages
+    for col in EXPORT_RATE_COLUMNS:
+        if col in export_df:
+            export_df[col] = export_df[col].multiply(100).round(2)
+    return export_df
+
+
+def select_export_columns(df, columns):
+    """Colonnes du frame correspondant aux libellés exportés retenus, dans leur ordre"""
+    source = dict(zip(export_labels(df), df.columns))
+    return df[[source[label] for label in columns]]
+
+
+def export_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Posts prêts à l'export, bloc par bloc
+
+    Un frame vide produit un bloc vide, pour que l'en-tête soit écrit.
+    """
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield export_frame(df.iloc[start:start + chunk_rows])
+
+
+def _write_csv(df, chunks, f):
+    # Horodatages écrits comme par to_csv sur le frame entier : sans l'heure
+    # seulement si tous sont à minuit (to_csv en décide sinon bloc par bloc)
+    date_formats = {}
+    for col in df.columns:
+        if col != 'date' and pd.api.types.is_datetime64_any_dtype(df[col]):
+            stamps = df[col].dropna()
+            dates_only = (stamps == stamps.dt.normalize()).all()
+            date_formats[EXPORT_COLUMNS.get(col, col)] = '%Y-%m-%d' if dates_only else '%Y-%m-%d %H:%M:%S'
+
+    # Séparateur ';' et BOM UTF-8 (une seule fois, en tête) : ouverture directe dans Excel
+    text = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+    for i, chunk in enumerate(chunks):
+        chunk = chunk.assign(**{col: chunk[col].dt.strftime(fmt) for col, fmt in date_formats.items()})
+        chunk.to_csv(text, sep=';', index=False, header=i == 0)
+    text.flush()
+    text.detach()
+
+
+def _write_parquet(df, chunks, f):
+    writer = None
+    for chunk in chunks:
+        if writer is None:
+            # Schéma du premier bloc ; une colonne encore vide y est typée en texte
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                for field in schema])
+            writer = pq.ParquetWriter(f, schema)
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    writer.close()
+
+
+def _write_xlsx(df, chunks, f):
+    # Classeur en écriture seule : les lignes ne sont pas conservées en mémoire
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Posts')
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            sheet.append(list(chunk.columns))
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(f)
+
+
+# Formats proposés : (extension, type MIME, fonction d'écriture)
+EXPORT_FORMATS = {'CSV': ('csv', 'text/csv', _write_csv)}
+if pq is not None:
+    EXPORT_FORMATS['Parquet'] = ('parquet', 'application/vnd.apache.parquet', _write_parquet)
+if Workbook is not None:
+    EXPORT_FORMATS['Excel'] = ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                               _write_xlsx)
+
+
+def write_export(df, export_format, columns=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Écrire l'export dans un fichier temporaire, bloc par bloc
+
+    columns : libellés des colonnes exportées (toutes par défaut). Retourne le
+    fichier (binaire, non tamponné, positionné au début), supprimé à sa fermeture.
+    Lève ValueError au-delà de EXCEL_MAX_ROWS posts pour Excel.
+    """
+    if export_format == 'Excel' and len(df) > EXCEL_MAX_ROWS:
+        raise ValueError(f"Excel est limité à {EXCEL_MAX_ROWS:,} lignes ({len(df):,} posts)")
+    write = EXPORT_FORMATS[export_format][2]
+    if columns is not None:
+        df = select_export_columns(df, columns)
+
+    f = tempfile.TemporaryFile(buffering=0)
+    buffer = io.BufferedWriter(f)
+    write(df, export_chunks(df, chunk_rows), buffer)
+    buffer.flush()
+    buffer.detach()
+    f.seek(0)
+    return f
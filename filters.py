@@ -0,0 +1,145 @@
+"""Moteur de filtres : un masque de bits précalculé par valeur des colonnes filtrables"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Colonnes pour lesquelles un masque par valeur est construit au chargement
+FILTER_COLUMNS = ['type', 'periode', 'contenu', 'collab', 'hashtags', 'heure_bin']
+
+
+def date_bounds(dates, start, end):
+    """Bornes [début, fin) des lignes datées du jour start au jour end inclus
+
+    dates est un tableau datetime64[ns] trié (NaT en fin) : deux recherches
+    dichotomiques remplacent la comparaison de chaque ligne.
+    """
+    lo = np.searchsorted(dates, np.datetime64(start, 'ns'), side='left')
+    hi = np.searchsorted(dates, np.datetime64(end, 'ns') + np.timedelta64(1, 'D'), side='left')
+    return lo, max(lo, hi)
+
+
+class FilterIndex:
+    """Masques de bits (np.packbits) par valeur, combinés par ET binaire
+
+    Chaque masque occupe un bit par ligne : combiner les filtres actifs revient à
+    quelques ET/OU sur des tableaux d'octets, quel que soit le nombre de posts.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        # df doit être trié par date (c'est le cas du frame renvoyé par load_posts)
+        self.df = df
+        self.n_rows = len(df)
+        self.dates = df['date'].to_numpy(dtype='datetime64[ns]')
+        self.masks = {col: self._value_masks(df[col]) for col in columns if col in df.columns}
+
+    @staticmethod
+    def _value_masks(values):
+        # Les valeurs manquantes (code -1) n'appartiennent à aucun masque
+        codes, uniques = pd.factorize(values, sort=True)
+        return {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+
+    def all_rows(self):
+        """Masque retenant toutes les lignes"""
+        return np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def from_bool(self, mask):
+        """Convertir un masque booléen (une valeur par ligne) en masque de bits"""
+        return np.packbits(np.asarray(mask, dtype=bool))
+
+    def from_positions(self, positions):
+        """Masque de bits des lignes aux positions (iloc) données"""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[positions] = True
+        return np.packbits(mask)
+
+    def date_range(self, start, end):
+        """Masque des lignes datées entre start et end inclus"""
+        lo, hi = date_bounds(self.dates, start, end)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[lo:hi] = True
+        return np.packbits(mask)
+
+    def values(self, column, within=None):
+        """Valeurs de la colonne présentes dans les lignes retenues par within"""
+        masks = self.masks[column]
+        if within is None:
+            return list(masks)
+        return [value for value, bits in masks.items() if np.bitwise_and(bits, within).any()]
+
+    def mask(self, column, selected):
+        """Masque des lignes dont la valeur de la colonne est dans selected"""
+        result = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        masks = self.masks[column]
+        for value in selected:
+            if value in masks:
+                result |= masks[value]
+        return result
+
+    def key(self, bits):
+        """Empreinte courte d'un masque de bits, utilisable comme clé de cache"""
+        return hashlib.blake2b(bits.tobytes(), digest_size=16).hexdigest()
+
+    def positions(self, bits):
+        """Positions (iloc) des lignes retenues par un masque de bits"""
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+    def select(self, bits):
+        """DataFrame des lignes retenues ; sans copie quand aucune ligne n'est exclue"""
+        positions = self.positions(bits)
+        if len(positions) == self.n_rows:
+            return self.df
+        return self.df.take(positions)
+
+
+class Selection:
+    """Filtres actifs : masque de bits des posts et conditions appliquées
+
+    Les conditions enregistrées peuvent être rejouées sur un autre index (le cube
+    journalier par exemple) dont les colonnes filtrables portent les mêmes valeurs.
+    """
+
+    def __init__(self, filter_index):
+        self.filter_index = filter_index
+        self.bits = filter_index.all_rows()
+        self.dates = None
+        self.clauses = []
+
+    def restrict_dates(self, start, end):
+        """Ne retenir que les lignes datées entre start et end inclus"""
+        self.dates = (start, end)
+        self.bits &= self.filter_index.date_range(start, end)
+
+    def restrict(self, column, selected):
+        """Ne retenir que les lignes dont la valeur de la colonne est dans selected"""
+        self.clauses.append((column, list(selected)))
+        self.bits &= self.filter_index.mask(column, selected)
+
+    def bits_for(self, other_index):
+        """Masque de bits des mêmes filtres sur un autre index"""
+        bits = other_index.all_rows()
+        if self.dates is not None:
+            bits &= other_index.date_range(*self.dates)
+        for column, selected in self.clauses:
+            bits &= other_index.mask(column, selected)
+        return bits
+
+
+class TypeViews:
+    """Posts d'un type donné parmi la sélection courante, extraits à la première demande
+
+    Le masque de type précalculé est combiné au masque des filtres ; seules les
+    lignes du type demandé sont extraites, une seule fois par exécution du script.
+    Les frames renvoyés peuvent être partagés : ne pas les modifier en place.
+    """
+
+    def __init__(self, filter_index, row_mask):
+        self.filter_index = filter_index
+        self.row_mask = row_mask
+        self._frames = {}
+
+    def __getitem__(self, post_type):
+        if post_type not in self._frames:
+            bits = self.row_mask & self.filter_index.mask('type', [post_type])
+            self._frames[post_type] = self.filter_index.select(bits)
+        return self._frames[post_type]
@@ -0,0 +1,145 @@
+"""Profilage des exécutions du script : durée et pic mémoire de chaque étape
+
+Un Profiler est actif pour une exécution (thread du script) ; les étapes sont
+déclarées avec le gestionnaire de contexte stage() ou le décorateur profiled(),
+qui ne font rien quand aucun profilage n'est en cours (autres sessions, thread
+de surveillance des données).
+"""
+import json
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+# Fichier JSON lines des exécutions profilées (une ligne par exécution)
+PROFILE_LOG_PATH = 'profiling.jsonl'
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+# Profilers en cours qui suivent la mémoire : tracemalloc est global au processus
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def _acquire_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+class Profiler:
+    """Étapes mesurées d'une exécution : durée et pic mémoire alloué
+
+    Le pic mémoire est mesuré avec tracemalloc (allocations Python et numpy),
+    relativement à la mémoire allouée au début de l'étape ; le pic d'une étape
+    englobe celui des étapes imbriquées. Le suivi est global au processus : des
+    exécutions profilées simultanément voient les allocations des unes et des autres.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._start = time.perf_counter()
+        # Suivi libéré par close(), ou à la destruction d'une exécution interrompue
+        self._release = weakref.finalize(self, _release_tracing) if trace_memory else None
+        if trace_memory:
+            _acquire_tracing()
+
+    @contextmanager
+    def stage(self, name):
+        record = {'stage': name, 'depth': len(self._stack), 'seconds': None, 'peak_bytes': None}
+        self.records.append(record)
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+        frame = {'base': current if self.trace_memory else 0, 'peak': 0}
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self._stack.pop()
+            if self.trace_memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = max(peak - frame['base'], 0)
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+
+    def total_seconds(self):
+        return time.perf_counter() - self._start
+
+    def close(self):
+        """Libérer le suivi mémoire (arrêté quand plus aucun profiler ne l'utilise)"""
+        if self._release is not None:
+            self._release()
+
+    def to_json(self, **context):
+        """Ligne JSON de l'exécution (context : session, compte, nombre de posts...)"""
+        return json.dumps({
+            'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            **context,
+            'total_seconds': self.total_seconds(),
+            'stages': self.records
+        }, ensure_ascii=False, default=str)
+
+
+def start_profiling(trace_memory=True):
+    """Démarrer le profilage de l'exécution courante du script"""
+    stop_profiling()
+    _local.profiler = Profiler(trace_memory)
+    return _local.profiler
+
+
+def stop_profiling():
+    """Terminer le profilage en cours ; retourne le Profiler ou None"""
+    profiler = getattr(_local, 'profiler', None)
+    _local.profiler = None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+
+@contextmanager
+def stage(name):
+    """Mesurer le bloc comme une étape de l'exécution profilée, s'il y en a une"""
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def profiled(name):
+    """Décorateur : chaque appel de la fonction est une étape"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def append_log(line, path=PROFILE_LOG_PATH):
+    """Ajouter une exécution au fichier JSON lines"""
+    with _log_lock, open(path, 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
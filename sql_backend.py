@@ -0,0 +1,254 @@
+"""Moteur SQL optionnel : filtres et agrégations exécutés par une base embarquée
+
+DuckDB est utilisé s'il est installé (scan en colonnes), sinon SQLite (bibliothèque
+standard). Les résultats ont la même forme que ceux du moteur pandas.
+"""
+import sqlite3
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from aggregations import SEGMENT_STATS
+from data_loader import JOURS_SEMAINE, NUMERIC_COLUMNS
+
+# duckdb est optionnel : sans lui, SQLite
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+SQL_ENGINE = 'DuckDB' if duckdb is not None else 'SQLite'
+
+# Colonnes chargées dans la table posts
+SQL_DIMENSIONS = ['type', 'contenu', 'periode', 'collab', 'hashtags', 'heure_bin', 'jour_semaine', 'hour']
+SQL_METRICS = NUMERIC_COLUMNS + ['taux_engagement', 'taux_attraction', 'pct_non_followers',
+                                 'profile_visit_rate', 'follow_rate', 'external_ctr']
+
+# Métriques calculées dans les onglets, traduites en expressions SQL
+SQL_EXPRESSIONS = {
+    'enregistrements_1k': '"enregistrements" * 1000.0 / NULLIF("vues", 0)'
+}
+
+
+def _quote(col):
+    return f'"{col}"'
+
+
+def _metric(col):
+    return SQL_EXPRESSIONS.get(col, _quote(col))
+
+
+def _param(value):
+    """Valeur Python liable en paramètre (scalaires numpy, booléens stockés en 0/1)"""
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _posts_table(df):
+    """Colonnes utiles du frame, converties en types SQL simples (NULL pour les manquants)"""
+    table = pd.DataFrame({'row_id': np.arange(len(df), dtype='int64')})
+    table['date'] = df['date'].dt.strftime('%Y-%m-%d').astype(object).where(df['date'].notna(), None).values
+    for col in SQL_DIMENSIONS + SQL_METRICS:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if pd.api.types.is_bool_dtype(values):
+            table[col] = values.astype('int64').values
+        elif pd.api.types.is_float_dtype(values):
+            table[col] = values.astype('float64').values
+        else:
+            table[col] = values.astype(object).where(values.notna(), None).values
+    return table
+
+
+class SqlBackend:
+    """Base embarquée contenant les posts enrichis d'une version des données"""
+
+    def __init__(self, df):
+        self.engine = SQL_ENGINE
+        self.dtypes = df.dtypes
+        self._lock = threading.Lock()
+        table = _posts_table(df)
+        if duckdb is not None:
+            self._con = duckdb.connect()
+            self._con.register('posts_src', table)
+            self._con.execute("CREATE TABLE posts AS SELECT * EXCLUDE (date), "
+                              "CAST(date AS DATE) AS date FROM posts_src")
+            self._con.unregister('posts_src')
+        else:
+            self._con = sqlite3.connect(':memory:', check_same_thread=False)
+            table.to_sql('posts', self._con, index=False)
+            self._con.execute('CREATE INDEX posts_date ON posts (date)')
+
+    def query(self, sql, params=()):
+        """Exécuter une requête et retourner le résultat en DataFrame"""
+        with self._lock:
+            if duckdb is not None:
+                return self._con.execute(sql, list(params)).df()
+            return pd.read_sql_query(sql, self._con, params=list(params))
+
+    def date_param(self, day):
+        return day if duckdb is not None else day.isoformat()
+
+    def period(self, resolution):
+        """Expression SQL de la période d'une date (comme aggregations.period_key)"""
+        if resolution == 'Jour':
+            return 'date'
+        if resolution == 'Semaine':
+            if duckdb is not None:
+                return "CAST(date_trunc('week', date) AS DATE)"
+            return "date(date, '-' || ((CAST(strftime('%w', date) AS INTEGER) + 6) % 7) || ' days')"
+        if duckdb is not None:
+            return "strftime(date, '%Y-%m')"
+        return "strftime('%Y-%m', date)"
+
+    def bind(self, selection):
+        """Requêtes restreintes aux filtres actifs"""
+        return SqlSelection(self, selection)
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+
+class SqlSelection:
+    """Filtres de la barre latérale compilés en clause WHERE, et requêtes associées"""
+
+    def __init__(self, backend, selection):
+        self.backend = backend
+        self.selection = selection
+
+    def where(self, post_type=None, extra=()):
+        """Clause WHERE et paramètres pour les filtres actifs (et le type de post)"""
+        conditions, params = list(extra), []
+        if self.selection.dates is not None:
+            start, end = self.selection.dates
+            conditions.append('date >= ? AND date < ?')
+            params += [self.backend.date_param(start), self.backend.date_param(end + timedelta(days=1))]
+        clauses = list(self.selection.clauses)
+        if post_type is not None:
+            clauses.append(('type', [post_type]))
+        for column, selected in clauses:
+            if selected:
+                conditions.append(f"{_quote(column)} IN ({', '.join('?' * len(selected))})")
+                params += [_param(value) for value in selected]
+            else:
+                conditions.append('1 = 0')
+        return ('WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+    def positions(self, post_type=None):
+        """Positions (iloc) des posts retenus"""
+        where, params = self.where(post_type)
+        result = self.backend.query(f'SELECT row_id FROM posts {where} ORDER BY row_id', params)
+        return result['row_id'].to_numpy(dtype='int64')
+
+    def time_series(self, post_type, metric_cols, resolution, aggregation):
+        """Séries temporelles des métriques (comme aggregations.rollup_time_series)"""
+        template = 'COALESCE(SUM({}), 0)' if aggregation == 'Somme' else 'AVG({})'
+        columns = ', '.join(f'{template.format(_metric(col))} AS {_quote(col)}' for col in metric_cols)
+        where, params = self.where(post_type, extra=['date IS NOT NULL'])
+        result = self.backend.query(
+            f'SELECT {self.backend.period(resolution)} AS period, {columns} '
+            f'FROM posts {where} GROUP BY 1 ORDER BY 1', params)
+        result = result.set_index('period')
+        if resolution != 'Mois':
+            result.index = pd.to_datetime(result.index)
+        return result
+
+    def _values(self, keys, metric_cols, post_type, extra=()):
+        """Colonnes keys et valeurs des métriques des posts retenus"""
+        key_sql = ', '.join(_quote(key) for key in keys)
+        columns = ', '.join(f'{_metric(col)} AS {_quote(col)}' for col in metric_cols)
+        where, params = self.where(post_type, extra=extra)
+        values = self.backend.query(f'SELECT {key_sql}, {columns} FROM posts {where}', params)
+        values[metric_cols] = values[metric_cols].astype('float64')
+        return values
+
+    def _medians(self, keys, metric_cols, post_type, extra, values=None):
+        """Médiane de chaque métrique par groupe de keys
+
+        values : valeurs déjà lues par _values (SQLite), restreintes à extra.
+        """
+        if self.backend.engine == 'DuckDB':
+            key_sql = ', '.join(_quote(key) for key in keys)
+            columns = ', '.join(f'median({_metric(col)}) AS {_quote(col)}' for col in metric_cols)
+            where, params = self.where(post_type, extra=extra)
+            return self.backend.query(f'SELECT {key_sql}, {columns} FROM posts {where} GROUP BY {key_sql}',
+                                      params)
+        # SQLite n'a pas de médiane : médianes calculées par pandas sur les valeurs lues
+        if values is None:
+            values = self._values(keys, metric_cols, post_type, extra)
+        return values.groupby(keys, dropna=False)[metric_cols].median().reset_index()
+
+    def _restore_keys(self, frame, keys):
+        """Rendre aux colonnes de regroupement leur type pandas (catégories, booléens...)"""
+        for key in keys:
+            dtype = self.backend.dtypes[key]
+            if pd.api.types.is_bool_dtype(dtype):
+                frame[key] = frame[key].astype(bool)
+            else:
+                frame[key] = pd.Series(frame[key].astype(object).where(frame[key].notna(), None),
+                                       index=frame.index).astype(dtype)
+        return frame
+
+    def segment_stats(self, post_type, segments, metric_cols):
+        """Statistiques par segment (comme aggregations.segment_stats)"""
+        values = None
+        if self.backend.engine != 'DuckDB':
+            # Valeurs des posts retenus lues une seule fois pour les médianes de tous les segments
+            keys = list(dict.fromkeys(key for segment in segments
+                                      for key in ([segment] if isinstance(segment, str) else segment)))
+            values = self._values(keys, metric_cols, post_type)
+        return {segment: self._segment_stats(segment, post_type, metric_cols, values) for segment in segments}
+
+    def _segment_stats(self, segment, post_type, metric_cols, values=None):
+        keys = [segment] if isinstance(segment, str) else list(segment)
+        if values is not None and isinstance(segment, str):
+            values = values[values[segment].notna()]
+        # Segment simple : valeurs manquantes exclues ; segment croisé : elles forment un groupe
+        extra = [f'{_quote(segment)} IS NOT NULL'] if isinstance(segment, str) else []
+        key_sql = ', '.join(_quote(key) for key in keys)
+        aggregates = {
+            'mean': 'AVG({})',
+            'sum': 'COALESCE(SUM({}), 0)',
+            'count': 'COUNT({})'
+        }
+        columns = ', '.join(f'{template.format(_metric(col))} AS "{col}|{stat}"'
+                            for col in metric_cols for stat, template in aggregates.items())
+        where, params = self.where(post_type, extra=extra)
+        result = self.backend.query(f'SELECT {key_sql}, {columns} FROM posts {where} GROUP BY {key_sql}',
+                                    params)
+        result = self._restore_keys(result, keys).set_index(keys)
+
+        # Colonnes (métrique, statistique) dans l'ordre de SEGMENT_STATS
+        medians = self._medians(keys, metric_cols, post_type, extra, values)
+        medians = self._restore_keys(medians, keys).set_index(keys)
+        medians = medians.reindex(result.index)
+        data = {}
+        for col in metric_cols:
+            for stat in SEGMENT_STATS:
+                if stat == 'median':
+                    data[(col, stat)] = medians[col]
+                else:
+                    data[(col, stat)] = result[f'{col}|{stat}']
+        stats = pd.DataFrame(data, index=result.index).sort_index(na_position='last')
+
+        if len(keys) > 1:
+            stats.index = pd.Index([' × '.join(map(str, key)) for key in stats.index], name='segment')
+        return stats
+
+    def heatmap(self, value_col, index='jour_semaine', columns='hour'):
+        """Médiane de value_col par jour et par heure (comme pd.pivot_table, fill_value=0)"""
+        long = self._medians([index, columns], [value_col], None,
+                             extra=[f'{_quote(index)} IS NOT NULL', f'{_quote(columns)} IS NOT NULL',
+                                    f'{_metric(value_col)} IS NOT NULL'])
+        long = self._restore_keys(long, [index, columns])
+        pivot = long.pivot(index=index, columns=columns, values=value_col).fillna(0)
+        pivot = pivot.sort_index(axis=1)
+        days = [day for day in JOURS_SEMAINE.values() if day in pivot.index]
+        return pivot.reindex(days)